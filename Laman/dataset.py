@@ -1,13 +1,23 @@
-import pandas as pd
 import streamlit as st
-from sqlalchemy import text
 from db_config import get_engine
-from utils.retention import cleanup_expired_datasets, days_to_expiry
+from utils.data_access import read_preview
+from utils.loader import ConcurrentLoader
+from utils.retention import list_catalog
+
+PREVIEW_ROWS = 1000
 
 @st.cache_data(show_spinner=False)
-def _read_table(table: str, _engine):
-    """Cache pembacaan tabel. _engine diabaikan hashing-nya oleh Streamlit."""
-    return pd.read_sql(table, con=_engine)
+def _read_preview(table: str, clustered_at, _engine):
+    """Cache pratinjau per waktu clustering. _engine diabaikan hashing-nya oleh Streamlit."""
+    return read_preview(_engine, table, limit=PREVIEW_ROWS)
+
+def _fmt_bytes(n) -> str:
+    if n is None:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:,.0f} {unit}" if unit == "B" else f"{n:,.1f} {unit}"
+        n /= 1024
 
 def show_dataset():
     st.markdown("### 📚 Dataset (Hasil Proses)")
@@ -17,27 +27,28 @@ def show_dataset():
         st.error(f"❌ {e}")
         return
 
-    removed = cleanup_expired_datasets(engine)
-    if removed:
-        st.info("🧹 Dataset kedaluwarsa dihapus otomatis: " + ", ".join(f"`{t}`" for t in removed))
+    # Katalog dan pratinjau tabel yang terakhir dipilih dimuat bersamaan
+    state_key = "selected_clustered"
+    prev = st.session_state.get(state_key)
+    prev_at = st.session_state.get(f"{state_key}_at")
+    loader = ConcurrentLoader()
+    loader.submit("Katalog", list_catalog, engine, clustered_only=True)
+    if prev:
+        loader.submit("Pratinjau", _read_preview, prev, prev_at, engine)
 
+    # Satu query ke katalog _datasets_meta; tabel data tidak disentuh
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text("SHOW TABLES"))
-            clustered_tables = [
-                row[0] for row in result
-                if row[0].endswith("_clustered") and row[0] != "_datasets_meta"
-            ]
+        catalog = {e["clustered_table"]: e for e in loader.result("Katalog")}
     except Exception as e:
         st.error(f"❌ Gagal mengambil daftar tabel: {e}")
         return
+    clustered_tables = list(catalog)
 
     if not clustered_tables:
         st.info("Belum ada hasil clustering. Silakan lakukan proses clustering terlebih dahulu.")
         return
 
     # Sinkronisasi pilihan sebelumnya (pakai state khusus agar tidak bentrok dengan raw dataset)
-    state_key = "selected_clustered"
     if state_key in st.session_state and st.session_state[state_key] not in clustered_tables:
         del st.session_state[state_key]
 
@@ -50,14 +61,30 @@ def show_dataset():
     )
     st.session_state[state_key] = selected_clustered
 
-    base_table = selected_clustered[:-10] if selected_clustered.endswith("_clustered") else selected_clustered
-    sisa = days_to_expiry(engine, base_table)
+    entry = catalog[selected_clustered]
+    sisa = entry["days_left"]
     if sisa is not None:
         st.caption(f"⏳ Sisa masa simpan dataset ini: {sisa} hari (otomatis terhapus saat habis masa simpan)")
 
+    # Ringkasan dari katalog
+    n_rows = entry["row_count"]
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Jumlah Baris", f"{n_rows:,}" if n_rows is not None else "-")
+    c2.metric("Jumlah Kolom", len(entry["column_schema"]) if entry["column_schema"] else "-")
+    c3.metric("Ukuran Data", _fmt_bytes(entry["byte_size"]))
+    c4.metric("Jumlah Klaster (k)", entry["cluster_k"] if entry["cluster_k"] is not None else "-")
+    if entry["cluster_features"]:
+        st.caption("Fitur clustering: " + ", ".join(entry["cluster_features"]))
+
     try:
-        df = _read_table(selected_clustered, engine)
+        if selected_clustered == prev and entry["clustered_at"] == prev_at:
+            df = loader.result("Pratinjau")
+        else:
+            df = _read_preview(selected_clustered, entry["clustered_at"], engine)
+        st.session_state[f"{state_key}_at"] = entry["clustered_at"]
         st.dataframe(df, use_container_width=True)
+        if n_rows is not None and n_rows > len(df):
+            st.caption(f"Menampilkan {len(df):,} dari {n_rows:,} baris.")
     except Exception as e:
         st.error(f"❌ Gagal memuat `{selected_clustered}`: {e}")
         return
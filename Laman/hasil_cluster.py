@@ -1,14 +1,38 @@
 import io
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import streamlit as st
-from db_config import get_engine
+from db_config import get_engine, get_retention_days
 from utils.algoritma import (
-    KMeansCustom,
     MinMaxScaler,
-    compute_dbi,
+    KMeansCustom,
+    sweep_k,
+    elbow_k,
     apply_descriptive_labels,
 )
+from utils.cache import get_cluster_cache, get_map_cache, make_sweep_key
+from utils.db_writer import bulk_write, infer_column_types
+from utils.checksum import ChunkDigest
+from utils.data_access import mirror_current, table_columns, numeric_columns, read_columns, read_preview
+from utils.retention import register_clustered
+from utils.model_store import save_model
+from utils.incremental import build_model_state
+
+# Parameter KMeans yang dipakai seluruh halaman (k-means++ + beberapa restart)
+KMEANS_PARAMS = {"random_state": 42, "init": "k-means++", "n_init": 5, "algorithm": "hamerly"}
+# Dataset besar memakai mode mini-batch agar memori & waktu fit tetap terbatas
+MINIBATCH_MIN_ROWS = 100_000
+MINIBATCH_SIZE = 4096
+# Sweep k dijalankan paralel (process pool) hanya bila data cukup besar
+PARALLEL_MIN_ROWS = 20_000
+K_RANGE = list(range(1, 11))
+PREVIEW_ROWS = 1000
+
+def _kmeans_params(n_rows: int) -> dict:
+    if n_rows >= MINIBATCH_MIN_ROWS:
+        return {**KMEANS_PARAMS, "batch_size": MINIBATCH_SIZE}
+    return KMEANS_PARAMS
 
 def show_clustering():
     st.markdown('<h2 class="section-header">📊 Hasil Clustering</h2>', unsafe_allow_html=True)
@@ -22,11 +46,16 @@ def show_clustering():
     engine = get_engine()
 
     try:
-        df = pd.read_sql(table_name, con=engine)
+        # mirror dicek ke katalog sekali untuk semua pembacaan di render ini
+        mirror_ok = mirror_current(engine, table_name)
+        schema = table_columns(engine, table_name, mirror_ok)
         st.markdown(f"### Dataset: `{table_name}`")
-        st.dataframe(df, use_container_width=True)
+        preview = read_preview(engine, table_name, PREVIEW_ROWS, mirror_ok=mirror_ok)
+        st.dataframe(preview, use_container_width=True)
+        if len(preview) == PREVIEW_ROWS:
+            st.caption(f"Menampilkan {PREVIEW_ROWS:,} baris pertama.")
 
-        numeric_cols = df.select_dtypes(include='number').columns.tolist()
+        numeric_cols = numeric_columns(schema)
         st.markdown("### 🔢 Pilih Kolom untuk Clustering")
         default_feats = numeric_cols[:2] if len(numeric_cols) >= 2 else numeric_cols
         selected_features = st.multiselect("Pilih Kolom:", numeric_cols, default=default_feats)
@@ -34,23 +63,33 @@ def show_clustering():
             st.info("💡 Pilih minimal 2 kolom numerik.")
             return
 
-        if 'KECAMATAN' not in df.columns:
+        if 'KECAMATAN' not in schema:
             st.error("❌ Wajib ada kolom 'KECAMATAN' untuk visualisasi peta.")
             return
 
-        X = df[selected_features].values.tolist()
-        X_scaled = MinMaxScaler().fit_transform(X)
-
-        # Elbow (WCSS) & DBI plots
-        kmeans = KMeansCustom(random_state=42)
-        recommended_k, wcss_values = kmeans._elbow_method(X_scaled)
-
-        dbi_values = []
-        k_range_dbi = list(range(2, 11))
-        for k in k_range_dbi:
-            kmeans.n_clusters = k
-            kmeans.fit(X_scaled)
-            dbi_values.append(compute_dbi(X_scaled, kmeans.labels, kmeans.centroids, k))
+        # Hanya kolom yang dibutuhkan clustering yang diambil dari DB
+        df = read_columns(engine, table_name, ['KECAMATAN'] + selected_features, schema=schema,
+                          mirror_ok=mirror_ok)
+
+        scaler = MinMaxScaler()
+        X_scaled = scaler.fit_transform(df[selected_features])
+
+        # Elbow (WCSS) & DBI plots: satu fit per k, hasilnya dipakai ulang saat clustering.
+        # Hasil sweep di-cache per isi data + fitur + rentang k + parameter (termasuk seed).
+        params = _kmeans_params(len(X_scaled))
+        cache = get_cluster_cache()
+        cache_key = make_sweep_key(df, selected_features, K_RANGE, params, prefix=table_name)
+        sweep = cache.get(cache_key)
+        if sweep is None:
+            # -1 = process pool bersama milik utils.algoritma (jumlah worker dibatasi di sana)
+            n_jobs = -1 if len(X_scaled) >= PARALLEL_MIN_ROWS else None
+            sweep = sweep_k(X_scaled, K_RANGE, n_jobs=n_jobs, **params)
+            cache.put(cache_key, sweep)
+        wcss_values = [sweep[k]["wcss"] for k in K_RANGE]
+        recommended_k = elbow_k(K_RANGE, wcss_values)
+
+        k_range_dbi = [k for k in K_RANGE if k >= 2]
+        dbi_values = [sweep[k]["dbi"] for k in k_range_dbi]
 
         col1, col2 = st.columns(2)
         with col1:
@@ -74,29 +113,65 @@ def show_clustering():
             best_k_dbi = k_range_dbi[dbi_values.index(min(dbi_values))]
             st.caption(f"DBI terendah di k = **{best_k_dbi}**, nilai = **{min(dbi_values):.3f}**")
 
+        with st.expander("⏱️ Detail proses fit per k"):
+            st.dataframe(pd.DataFrame([
+                {"k": k, "Iterasi": sweep[k]["n_iter"], "Berhenti": sweep[k]["stop_reason"],
+                 "Waktu (detik)": round(sweep[k]["seconds"], 4)}
+                for k in K_RANGE
+            ]), use_container_width=True, hide_index=True)
+
         st.markdown("### 🔢 Tentukan Jumlah Klaster")
         n_clusters = st.slider("Jumlah Cluster (K):", 2, 10, value=int(recommended_k) if 2 <= recommended_k <= 10 else 3)
 
         if st.button("🚀 Jalankan Clustering"):
-            kmeans = KMeansCustom(n_clusters=n_clusters, random_state=42)
-            df['Cluster'] = kmeans.fit_predict(X_scaled)
+            fitted = sweep[n_clusters]
+            df['Cluster'] = fitted["labels"]
 
             df_labeled, labels_map = apply_descriptive_labels(df, selected_features, 'Cluster', n_clusters)
             result_df = df_labeled[['KECAMATAN'] + selected_features + ['Cluster', 'Keterangan']]
 
             clustered_table = f"{table_name}_clustered"
-            result_df.to_sql(clustered_table, con=engine, index=False, if_exists='replace')
+            # checksum isi dicatat di katalog; pembaca memakai mirror lokal hanya bila sama
+            column_types = infer_column_types(result_df)
+            digest = ChunkDigest(column_types)
+            bulk_write(engine, clustered_table, digest.tee([result_df]), column_types=column_types,
+                       if_exists='replace')
+            # render peta untuk versi tabel sebelumnya tidak dipakai lagi
+            get_map_cache().invalidate(predicate=lambda k: k.startswith(f"{clustered_table}@"))
+            register_clustered(engine, table_name, clustered_table, n_clusters, selected_features,
+                               retention_days=get_retention_days(), checksum=digest.checksum)
+
+            # Simpan scaler + centroid agar baris baru bisa diberi label tanpa clustering ulang
+            model = KMeansCustom.from_state({
+                "params": {**_kmeans_params(len(df)), "n_clusters": n_clusters},
+                "centroids": fitted["centroids"],
+                "counts": np.bincount(fitted["labels"], minlength=n_clusters),
+                "inertia": fitted["wcss"],
+            })
+            version = save_model(engine, table_name,
+                                 build_model_state(scaler, model, selected_features, labels_map, len(df)))
+            st.session_state.clustered_model_version = version
 
             st.session_state.clustered_table = clustered_table
             st.session_state.clustered_result_df = result_df.copy()
 
-            dbi_val = compute_dbi(X_scaled, df_labeled['Cluster'].tolist(), kmeans.centroids, n_clusters)
+            # Centroid dikembalikan ke satuan asli, diurutkan dari klaster terendah
+            centroid_df = pd.DataFrame(scaler.inverse_transform(fitted["centroids"]), columns=selected_features).round(2)
+            centroid_df.insert(0, 'Keterangan', centroid_df.index.map(labels_map))
+            st.session_state.clustered_centroids_df = centroid_df.loc[list(labels_map)]
+
+            dbi_val = fitted["dbi"]
             st.success(f"✅ Clustering selesai untuk k={n_clusters}. Nilai DBI = {dbi_val:.3f}")
+            st.caption(f"Model (scaler + centroid) tersimpan sebagai versi {version}.")
 
         if "clustered_result_df" in st.session_state:
             st.markdown("### 📋 Hasil Clustering")
             st.dataframe(st.session_state.clustered_result_df, use_container_width=True)
 
+            if "clustered_centroids_df" in st.session_state:
+                st.markdown("### 🎯 Pusat Klaster (Satuan Asli)")
+                st.dataframe(st.session_state.clustered_centroids_df, use_container_width=True, hide_index=True)
+
             st.markdown("### 💾 Unduh Hasil")
             col_csv, col_xlsx = st.columns(2)
             with col_csv:
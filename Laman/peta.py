@@ -1,200 +1,113 @@
 import os
 import json
+import html
+import base64
+import hashlib
+from typing import Tuple
+import numpy as np
 import pandas as pd
 import streamlit as st
+import streamlit.components.v1 as components
 import folium
 import altair as alt
+import pydeck as pdk
 from folium.plugins import Fullscreen
-from streamlit_folium import st_folium
 from db_config import get_engine
-
-@st.cache_data
-def load_geojson():
-    candidates = [
-        "/mnt/data/kecamatan_sulbar.geojson",
-        "assets/GeoJson/kecamatan_sulbar.geojson",
-        "assets/geojson/kecamatan_sulbar.geojson",
-        "data/kecamatan_sulbar.geojson",
-        "kecamatan_sulbar.geojson",
-    ]
-    for p in candidates:
+from utils.data_access import mirror_current, table_columns, numeric_columns, read_columns, table_version
+from utils.cache import get_map_cache
+from utils.loader import ConcurrentLoader
+from utils.geo import GeoIndex
+from utils.geostore import open_geo_store
+from utils.topology import LOD_LEVELS, Topology, level_for_zoom
+
+GEOJSON_CANDIDATES = [
+    "/mnt/data/kecamatan_sulbar.geojson",
+    "assets/GeoJson/kecamatan_sulbar.geojson",
+    "assets/geojson/kecamatan_sulbar.geojson",
+    "data/kecamatan_sulbar.geojson",
+    "kecamatan_sulbar.geojson",
+]
+
+def _geojson_path() -> str:
+    for p in GEOJSON_CANDIDATES:
         if os.path.exists(p):
-            with open(p, "r", encoding="utf-8") as f:
-                return json.load(f)
-    raise FileNotFoundError("File GeoJSON tidak ditemukan di: " + ", ".join(candidates))
-
-def get_name_from_props(props: dict) -> str | None:
-    keys = ("nm_kecamatan","nama_kecamatan","namakecam","kecamatan",
-            "NAMA_KEC","WADMKC","Kec","NAME_2","name")
-    for k in keys:
-        v = props.get(k)
-        if isinstance(v, str) and v.strip():
-            return v.strip()
-    return None
-
-def _iter_coords(geometry: dict):
-    if not geometry or "type" not in geometry or "coordinates" not in geometry:
-        return
-    gtype = geometry["type"]
-    coords = geometry["coordinates"]
-
-    def _pair(c):
-        if isinstance(c, (list, tuple)) and len(c) >= 2:
-            try:
-                return float(c[0]), float(c[1])
-            except Exception:
-                return None
-        return None
-
-    if gtype == "Point":
-        p = _pair(coords); 
-        if p: yield p
-    elif gtype in ("MultiPoint", "LineString"):
-        for c in coords:
-            p = _pair(c); 
-            if p: yield p
-    elif gtype == "MultiLineString":
-        for line in coords:
-            for c in line:
-                p = _pair(c); 
-                if p: yield p
-    elif gtype == "Polygon":
-        for ring in coords:
-            for c in ring:
-                p = _pair(c); 
-                if p: yield p
-    elif gtype == "MultiPolygon":
-        for poly in coords:
-            for ring in poly:
-                for c in ring:
-                    p = _pair(c); 
-                    if p: yield p
-
-def _collect_bounds(feature_collection: dict) -> list[list[float]]:
-    bounds = []
-    for feat in feature_collection.get("features", []):
-        geom = feat.get("geometry")
-        if not geom: 
-            continue
-        for lon, lat in _iter_coords(geom):
-            bounds.append([lat, lon])
-    return bounds
-
-def show_map():
-    st.markdown('<h2 class="section-header">🗺️ Peta Hasil Clustering - Sulawesi Barat</h2>', unsafe_allow_html=True)
-
-    if "clustered_table" not in st.session_state:
-        st.warning("⚠️ Tidak ada data clustering. Silakan jalankan clustering dulu.")
-        st.session_state.menu = "Lihat Hasil Clustering"
-        st.rerun()
-        return
-
-    try:
-        engine = get_engine()
-    except Exception as e:
-        st.error(f"❌ {e}")
-        return
-
-    table_name = st.session_state.clustered_table
-
-    try:
-        geojson = load_geojson()
-    except Exception as e:
-        st.error(f"❌ Gagal memuat GeoJSON: {e}")
-        return
-
-    try:
-        df_cluster = pd.read_sql(table_name, con=engine)
-    except Exception as e:
-        st.error(f"❌ Gagal mengambil data clustering: {e}")
-        return
-
+            return p
+    raise FileNotFoundError("File GeoJSON tidak ditemukan di: " + ", ".join(GEOJSON_CANDIDATES))
+
+@st.cache_resource(show_spinner=False)
+def _open_geo(path: str, mtime: float) -> Tuple[GeoIndex, Topology]:
+    # cache_resource: dibagi antar sesi tanpa salinan; mtime ikut kunci agar file baru terbaca.
+    # GeoJSON dibaca lewat store biner (mmap, dibangun ulang bila sumber berubah), bukan json.load;
+    # geometri fitur baru di-decode saat dirender.
+    store = open_geo_store(path)
+    return store.geo_index(), store.topology
+
+def load_geo() -> Tuple[GeoIndex, Topology]:
+    path = _geojson_path()
+    return _open_geo(path, os.path.getmtime(path))
+
+# zoom awal peta bila tidak ada bounds yang bisa di-fit
+MAP_ZOOM_START = 8
+MAP_HEIGHT = 600
+# di atas jumlah fitur ini mode "Otomatis" memakai renderer WebGL (pydeck) alih-alih Leaflet
+DECK_FEATURE_THRESHOLD = int(os.getenv("CLUSTER_MAP_DECK_THRESHOLD", "1000"))
+RENDERERS = ["Otomatis", "Folium", "WebGL (pydeck)"]
+
+def _load_cluster_table(engine, table_name: str):
+    mirror_ok = mirror_current(engine, table_name)
+    schema = table_columns(engine, table_name, mirror_ok)
     # Validasi kolom wajib
-    if not {'KECAMATAN', 'Keterangan'}.issubset(df_cluster.columns):
-        st.error("❌ Dataset wajib memiliki kolom 'KECAMATAN' dan 'Keterangan'.")
-        return
-
-    # Filter & pencarian
-    labels_all = sorted(df_cluster['Keterangan'].dropna().unique().tolist())
-    if not labels_all:
-        st.info("Tidak ada label klaster untuk ditampilkan.")
-        return
-
-    sel_labels = st.multiselect("🎯 Filter Klaster :", labels_all, default=labels_all)
-    q = st.text_input("🔎 Cari kecamatan :", value="").strip().lower()
-
-    df_view = df_cluster[df_cluster['Keterangan'].isin(sel_labels)].copy()
-    if q:
-        df_view = df_view[df_view['KECAMATAN'].astype(str).str.lower().str.contains(q)]
-
-    if df_view.empty:
-        st.info("Tidak ada data yang cocok dengan filter.")
-        return
-
-    # Inisialisasi peta
-    m = folium.Map(location=[-2.844, 119.232], zoom_start=8, tiles='OpenStreetMap')
+    if not {'KECAMATAN', 'Keterangan'}.issubset(schema):
+        raise ValueError("Dataset wajib memiliki kolom 'KECAMATAN' dan 'Keterangan'.")
+    # Hanya kolom yang dipakai peta: nama, label, dan kolom numerik untuk tooltip
+    map_cols = ['KECAMATAN', 'Keterangan'] + [c for c in numeric_columns(schema) if c != 'Cluster']
+    return read_columns(engine, table_name, map_cols, schema=schema, mirror_ok=mirror_ok)
+
+# Palet warna konsisten dengan legenda
+COLOR_MAP = {
+    'Sangat Rendah': 'lightred',
+    'Cukup Rendah': 'orange',
+    'Rendah': 'red',
+    'Agak Rendah': 'pink',
+    'Sedikit Rendah': 'lightpink',
+    'Sedang': 'blue',
+    'Sedikit Tinggi': 'lightblue',
+    'Agak Tinggi': 'cyan',
+    'Tinggi': 'green',
+    'Cukup Tinggi': 'lightgreen',
+    'Sangat Tinggi': 'darkgreen'
+}
+
+# nilai RGB nama warna di atas untuk pydeck (lightred bukan nama CSS; dipakai lightcoral)
+DECK_RGB = {
+    'lightred': (240, 128, 128),
+    'orange': (255, 165, 0),
+    'red': (255, 0, 0),
+    'pink': (255, 192, 203),
+    'lightpink': (255, 182, 193),
+    'blue': (0, 0, 255),
+    'lightblue': (173, 216, 230),
+    'cyan': (0, 255, 255),
+    'green': (0, 128, 0),
+    'lightgreen': (144, 238, 144),
+    'darkgreen': (0, 100, 0),
+    'gray': (128, 128, 128),
+}
+FILL_OPACITY = 0.7
+
+def _folium_html(geojson: dict, num_cols: list, bounds) -> str:
+    m = folium.Map(location=[-2.844, 119.232], zoom_start=MAP_ZOOM_START, tiles='OpenStreetMap')
     Fullscreen(position='topleft').add_to(m)
 
-    # Index nama -> feature GeoJSON
-    idx_feature = {}
-    for feat in geojson.get("features", []):
-        props = (feat.get("properties") or {})
-        nm = get_name_from_props(props)
-        if nm:
-            idx_feature[nm.strip().lower()] = feat
-
-    # Kolom numerik untuk tooltip
-    num_cols = [c for c in df_view.select_dtypes(include='number').columns if c not in ['Cluster']]
-
-    matched_features = []
-    not_found = []
-    for _, row in df_view.iterrows():
-        nama = str(row['KECAMATAN']).strip().lower()
-        feat = idx_feature.get(nama)
-        if not feat:
-            not_found.append(nama)
-            continue
-        new_feat = {
-            "type": "Feature",
-            "geometry": feat.get("geometry"),
-            "properties": dict(feat.get("properties", {}))
-        }
-        nm_orig = get_name_from_props(new_feat["properties"]) or row['KECAMATAN']
-        new_feat["properties"]["label_nama"] = nm_orig
-        new_feat["properties"]["kategori"] = row["Keterangan"]
-        for col in num_cols:
-            new_feat["properties"][col] = row[col]
-        matched_features.append(new_feat)
-
-    if not_found:
-        st.warning("⚠️ Tidak ditemukan di GeoJSON: " + ", ".join(sorted(set(not_found))))
-
-    filtered_geojson = {"type": "FeatureCollection", "features": matched_features}
-
-    # Palet warna konsisten dengan legenda
-    color_map = {
-        'Sangat Rendah': 'lightred',
-        'Cukup Rendah': 'orange',
-        'Rendah': 'red',
-        'Agak Rendah': 'pink',
-        'Sedikit Rendah': 'lightpink',
-        'Sedang': 'blue',
-        'Sedikit Tinggi': 'lightblue',
-        'Agak Tinggi': 'cyan',
-        'Tinggi': 'green',
-        'Cukup Tinggi': 'lightgreen',
-        'Sangat Tinggi': 'darkgreen'
-    }
-
     def style_fn(feature):
-        color = color_map.get(feature['properties'].get('kategori'), 'gray')
-        return {"fillColor": color, "color": "black", "weight": 1, "fillOpacity": 0.7}
+        color = COLOR_MAP.get(feature['properties'].get('kategori'), 'gray')
+        return {"fillColor": color, "color": "black", "weight": 1, "fillOpacity": FILL_OPACITY}
 
     tooltip_fields = ["label_nama", "kategori"] + num_cols
     tooltip_aliases = ["Kecamatan", "Potensi"] + num_cols
 
-    gj = folium.GeoJson(
-        filtered_geojson,
+    folium.GeoJson(
+        geojson,
         name="Kecamatan Terklaster",
         style_function=style_fn,
         tooltip=folium.GeoJsonTooltip(fields=tooltip_fields, aliases=tooltip_aliases)
@@ -202,66 +115,286 @@ def show_map():
 
     folium.LayerControl().add_to(m)
 
-    bounds = _collect_bounds(filtered_geojson)
     if bounds:
         try:
             m.fit_bounds(bounds)
         except Exception:
             pass
+    return m.get_root().render()
+
+def _fit_zoom(bounds) -> float:
+    """Zoom agar bounds muat di ~MAP_HEIGHT piksel (dunia = 256 piksel pada zoom 0)."""
+    if not bounds:
+        return float(MAP_ZOOM_START)
+    (lat0, lon0), (lat1, lon1) = bounds
+    span = max(lon1 - lon0, lat1 - lat0, 1e-6)
+    return float(np.clip(np.log2(MAP_HEIGHT * 360.0 / (256.0 * span)), 1, 16))
+
+def _json_num(v):
+    """NaN/inf tidak valid di JSON (deck.gl gagal mem-parse data URI) -> null."""
+    if isinstance(v, (float, np.floating)):
+        return float(v) if np.isfinite(v) else None
+    return v
+
+def _deck_spec(geojson: dict, num_cols: list, bounds) -> dict:
+    """
+    Data PolygonLayer pydeck: satu baris per poligon (MultiPolygon dipecah) dengan warna isi
+    RGBA yang sudah dihitung, sehingga browser tidak mengevaluasi aksesor per fitur.
+    Properti numerik memakai kunci n0, n1, ... agar aman dipakai di template tooltip.
+    Baris dikirim sebagai satu data URI JSON ringkas: pydeck menserialisasi data inline dengan
+    indent=2 (~3x lebih besar untuk array koordinat), sedangkan deck.gl memuat URI seperti URL.
+    """
+    alpha = int(round(FILL_OPACITY * 255))
+    fills = {k: [*DECK_RGB.get(c, DECK_RGB['gray']), alpha] for k, c in COLOR_MAP.items()}
+    default_fill = [*DECK_RGB['gray'], alpha]
+    keys = {c: f"n{j}" for j, c in enumerate(num_cols)}
+    rows = []
+    for feat in geojson["features"]:
+        geom = feat["geometry"] or {}
+        if geom.get("type") == "Polygon":
+            polys = [geom["coordinates"]]
+        elif geom.get("type") == "MultiPolygon":
+            polys = geom["coordinates"]
+        else:
+            continue
+        props = feat["properties"]
+        attrs = {"label_nama": props.get("label_nama"), "kategori": props.get("kategori"),
+                 **{keys[c]: _json_num(props.get(c)) for c in num_cols},
+                 "fill": fills.get(props.get("kategori"), default_fill)}
+        rows.extend({**attrs, "polygon": poly} for poly in polys)
+
+    tooltip = ("<b>Kecamatan:</b> {label_nama}<br/><b>Potensi:</b> {kategori}"
+               + "".join(f"<br/><b>{html.escape(str(c))}:</b> {{{keys[c]}}}" for c in num_cols))
+    if bounds:
+        (lat0, lon0), (lat1, lon1) = bounds
+        view = {"latitude": (lat0 + lat1) / 2, "longitude": (lon0 + lon1) / 2, "zoom": _fit_zoom(bounds)}
+    else:
+        view = {"latitude": -2.844, "longitude": 119.232, "zoom": MAP_ZOOM_START}
+    payload = json.dumps(rows, separators=(",", ":"), ensure_ascii=False, allow_nan=False,
+                         default=str).encode("utf-8")
+    data = "data:application/json;base64," + base64.b64encode(payload).decode("ascii")
+    return {"data": data, "tooltip": tooltip, "view": view}
+
+def _deck_chart(spec: dict) -> pdk.Deck:
+    layer = pdk.Layer(
+        "PolygonLayer",
+        spec["data"],
+        get_polygon="polygon",
+        get_fill_color="fill",
+        get_line_color=[0, 0, 0],
+        line_width_min_pixels=1,
+        stroked=True,
+        filled=True,
+        pickable=True,
+        auto_highlight=True,
+    )
+    return pdk.Deck(
+        layers=[layer],
+        initial_view_state=pdk.ViewState(**spec["view"]),
+        map_style=pdk.map_styles.CARTO_LIGHT,
+        tooltip={"html": spec["tooltip"]},
+    )
+
+def _render_view(df_view: pd.DataFrame, geo_index: GeoIndex, topology: Topology, detail: str,
+                 renderer: str = "Otomatis") -> dict:
+    """
+    Bangun semua keluaran halaman untuk df_view: pesan, legenda, peta (HTML folium atau data
+    layer pydeck), dan spesifikasi Vega-Lite grafik. Hasilnya hanya berisi string/dict/list
+    sehingga bisa di-cache. detail "Otomatis" memilih tingkat detail dari zoom hasil fit bounds.
+    """
+    messages = []  # (fungsi st, teks) sesuai urutan tampil
+
+    # Kolom numerik untuk tooltip
+    num_cols = [c for c in df_view.select_dtypes(include='number').columns if c not in ['Cluster']]
+
+    # Join baris klaster -> fitur GeoJSON (nama dinormalisasi + fuzzy, sekali per nama unik)
+    ids, fuzzy = geo_index.match(df_view['KECAMATAN'])
+    found = ids >= 0
+    matched_ids = ids[found]
+
+    not_found = df_view.loc[~found, 'KECAMATAN'].astype(str).str.strip().unique().tolist()
+    if not_found:
+        messages.append(("warning", "⚠️ Tidak ditemukan di GeoJSON: " + ", ".join(sorted(not_found))))
+    if fuzzy:
+        messages.append(("caption", "ℹ️ Nama dicocokkan dengan ejaan terdekat: "
+                         + ", ".join(f"{a} → {b}" for a, b in sorted(fuzzy.items()))))
+
+    df_match = df_view.loc[found]
+    geo_names = np.array(geo_index.names, dtype=object)[matched_ids]
+    props = df_match[['Keterangan'] + num_cols].rename(columns={'Keterangan': 'kategori'})
+    props.insert(0, 'label_nama', np.where(pd.isna(geo_names), df_match['KECAMATAN'].to_numpy(dtype=object), geo_names))
+
+    # bounds dari bbox fitur yang sudah dihitung di indeks
+    bounds = geo_index.bounds(matched_ids)
+    if not bounds:
+        messages.append(("info", "ℹ️ Tidak ada koordinat yang dapat dihitung untuk fit bounds."))
+
+    # Geometri disederhanakan sesuai tingkat detail (batas bersama tetap berimpit)
+    level = level_for_zoom(_fit_zoom(bounds)) if detail == "Otomatis" else detail
+    messages.append(("caption", f"🧭 Detail: {level} · {topology.n_points(level, matched_ids):,} titik "
+                                f"(penuh: {topology.n_points('penuh', matched_ids):,})"))
+    filtered_geojson = geo_index.feature_collection(matched_ids, props, topology.geometries_at(level))
+
+    # Leaflet (SVG per fitur) melambat untuk ribuan poligon; di atas ambang pakai WebGL
+    use_deck = renderer == "WebGL (pydeck)" or (renderer == "Otomatis" and len(matched_ids) > DECK_FEATURE_THRESHOLD)
+    if use_deck:
+        messages.append(("caption", f"🖥️ Mode WebGL (pydeck) · {len(matched_ids):,} fitur"))
+        map_html, deck = None, _deck_spec(filtered_geojson, num_cols, bounds)
     else:
-        st.info("ℹ️ Tidak ada koordinat yang dapat dihitung untuk fit bounds.")
+        map_html, deck = _folium_html(filtered_geojson, num_cols, bounds), None
+
+    legend = [(k, COLOR_MAP.get(k, 'gray')) for k in sorted(df_view['Keterangan'].dropna().unique().tolist())]
+
+    # Data agregasi jumlah kecamatan per klaster (mengikuti filter & pencarian)
+    counts = (
+        df_view.assign(KECAMATAN=df_view['KECAMATAN'].astype(str))
+               .groupby('Keterangan', as_index=False)
+               .agg(Jumlah=('KECAMATAN', 'count'))
+    )
+
+    chart_spec = None
+    if not counts.empty:
+        # Urutan domain kategori sesuai urutan tampil (bisa disesuaikan)
+        domain = counts['Keterangan'].tolist()
+        range_colors = [COLOR_MAP.get(k, 'gray') for k in domain]
+
+        base = alt.Chart(counts).encode(
+            x=alt.X('Keterangan:N', title='Klaster', sort=domain),
+            y=alt.Y('Jumlah:Q', title='Jumlah Kecamatan'),
+            tooltip=[alt.Tooltip('Keterangan:N', title='Klaster'),
+                     alt.Tooltip('Jumlah:Q', title='Jumlah')]
+        )
+
+        bars = base.mark_bar().encode(
+            color=alt.Color('Keterangan:N',
+                            scale=alt.Scale(domain=domain, range=range_colors),
+                            legend=None)
+        )
+
+        labels = base.mark_text(dy=-5).encode(text='Jumlah:Q')
+
+        chart_spec = (bars + labels).properties(width='container', height=320).to_dict()
+
+    return {
+        "messages": messages,
+        "legend": legend,
+        "map_html": map_html,
+        "deck": deck,
+        "chart": chart_spec,
+    }
+
+def _show_view(view: dict):
+    for kind, msg in view["messages"]:
+        getattr(st, kind)(msg)
 
     # Legenda
     st.markdown("### 🗒️ Keterangan Warna")
-    for kategori in sorted(df_view['Keterangan'].dropna().unique().tolist()):
+    for kategori, color in view["legend"]:
         st.markdown(
             f"<div style='display:flex;align-items:center;margin-bottom:4px;'>"
-            f"<div style='background:{color_map.get(kategori,'gray')};width:15px;height:15px;border-radius:2px;margin-right:8px;'></div>"
+            f"<div style='background:{color};width:15px;height:15px;border-radius:2px;margin-right:8px;'></div>"
             f"<span>{kategori}</span></div>", unsafe_allow_html=True
         )
 
-    # Peta
+    # Peta (HTML folium yang sudah dirender atau layer pydeck; tidak ada nilai balik yang dipakai)
     st.markdown("### 📍 Peta Klaster")
-    st_folium(m, width='100%', height=600, returned_objects=[], key="folium_map_unique")
+    if view["deck"] is not None:
+        st.pydeck_chart(_deck_chart(view["deck"]), use_container_width=True, height=MAP_HEIGHT)
+    else:
+        components.html(view["map_html"], height=MAP_HEIGHT)
 
     # ===============================
     # 📊 BAR CHART DI BAWAH PETA
     # ===============================
     st.markdown("### 📊 Jumlah Kecamatan per Klaster")
+    if view["chart"] is None:
+        st.info("Tidak ada data untuk ditampilkan pada grafik.")
+        return
+    st.vega_lite_chart(view["chart"], use_container_width=True)
 
-    # Data agregasi jumlah kecamatan per klaster (mengikuti filter & pencarian)
-    counts = (
-        df_view.assign(KECAMATAN=df_view['KECAMATAN'].astype(str))
-               .groupby('Keterangan', as_index=False)
-               .agg(Jumlah=('KECAMATAN', 'count'))
-    )
+def show_map():
+    st.markdown('<h2 class="section-header">🗺️ Peta Hasil Clustering - Sulawesi Barat</h2>', unsafe_allow_html=True)
 
-    if counts.empty:
-        st.info("Tidak ada data untuk ditampilkan pada grafik.")
+    if "clustered_table" not in st.session_state:
+        st.warning("⚠️ Tidak ada data clustering. Silakan jalankan clustering dulu.")
+        st.session_state.menu = "Lihat Hasil Clustering"
+        st.rerun()
         return
 
-    # Urutan domain kategori sesuai urutan tampil (bisa disesuaikan)
-    domain = counts['Keterangan'].tolist()
-    range_colors = [color_map.get(k, 'gray') for k in domain]
+    try:
+        engine = get_engine()
+    except Exception as e:
+        st.error(f"❌ {e}")
+        return
 
-    base = alt.Chart(counts).encode(
-        x=alt.X('Keterangan:N', title='Klaster', sort=domain),
-        y=alt.Y('Jumlah:Q', title='Jumlah Kecamatan'),
-        tooltip=[alt.Tooltip('Keterangan:N', title='Klaster'),
-                 alt.Tooltip('Jumlah:Q', title='Jumlah')]
-    )
+    table_name = st.session_state.clustered_table
 
-    bars = base.mark_bar().encode(
-        color=alt.Color('Keterangan:N',
-                        scale=alt.Scale(domain=domain, range=range_colors),
-                        legend=None)
-    )
+    # Cache render: key diawali "<tabel>@<versi>", versi berubah tiap tabel ditulis ulang
+    cache = get_map_cache()
+    prefix = f"{table_name}@{table_version(table_name)}"
+    df_cluster = cache.get(f"{prefix}__data")
+
+    # GeoJSON dan tabel clustering (bila belum di-cache) dimuat bersamaan
+    loader = ConcurrentLoader()
+    loader.submit("GeoJSON", load_geo)
+    if df_cluster is None:
+        loader.submit("Tabel clustering", _load_cluster_table, engine, table_name)
+    timings = loader.wait()
 
-    labels = base.mark_text(dy=-5).encode(text='Jumlah:Q')
+    try:
+        geo_index, topology = loader.result("GeoJSON")
+    except Exception as e:
+        st.error(f"❌ Gagal memuat GeoJSON: {e}")
+        return
 
-    chart = (bars + labels).properties(width='container', height=320)
+    if df_cluster is None:
+        try:
+            df_cluster = loader.result("Tabel clustering")
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            return
+        except Exception as e:
+            st.error(f"❌ Gagal mengambil data clustering: {e}")
+            return
+        cache.put(f"{prefix}__data", df_cluster)
+    else:
+        timings["Tabel clustering (cache)"] = 0.0
 
-    st.altair_chart(chart, use_container_width=True)
+    with st.expander("⏱️ Waktu muat data"):
+        st.caption(" · ".join(f"{name}: {sec:.3f} dtk" for name, sec in timings.items())
+                   + f" · total: {loader.elapsed:.3f} dtk")
+
+    # Filter & pencarian
+    labels_all = sorted(df_cluster['Keterangan'].dropna().unique().tolist())
+    if not labels_all:
+        st.info("Tidak ada label klaster untuk ditampilkan.")
+        return
+
+    sel_labels = st.multiselect("🎯 Filter Klaster :", labels_all, default=labels_all)
+    q = st.text_input("🔎 Cari kecamatan :", value="").strip().lower()
+    detail = st.select_slider("🧭 Detail batas wilayah :", options=["Otomatis"] + list(LOD_LEVELS),
+                              value="Otomatis")
+    renderer = st.radio("🖥️ Mode peta :", RENDERERS, horizontal=True,
+                        help=f"Otomatis: WebGL (pydeck) bila lebih dari {DECK_FEATURE_THRESHOLD:,} wilayah.")
+
+    view_key = f"{prefix}__view_" + hashlib.sha1(json.dumps({
+        "labels": sorted(sel_labels), "q": q, "detail": detail, "renderer": renderer,
+        "geo": os.path.getmtime(_geojson_path()),
+    }, ensure_ascii=False).encode("utf-8")).hexdigest()[:20]
+    view = cache.get(view_key)
+    if view is None:
+        df_view = df_cluster[df_cluster['Keterangan'].isin(sel_labels)].copy()
+        if q:
+            df_view = df_view[df_view['KECAMATAN'].astype(str).str.lower().str.contains(q)]
+
+        if df_view.empty:
+            st.info("Tidak ada data yang cocok dengan filter.")
+            return
+
+        view = _render_view(df_view, geo_index, topology, detail, renderer)
+        cache.put(view_key, view)
+
+    _show_view(view)
 
 if __name__ == "__main__":
-    show_map()
\ No newline at end of file
+    show_map()
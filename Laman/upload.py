@@ -1,11 +1,20 @@
 import streamlit as st
 import pandas as pd
 import re
+from typing import Iterable
 from datetime import datetime
-from sqlalchemy import text
-from utils.baca_file import read_file
-from db_config import get_engine, get_db_name, get_retention_days
-from utils.retention import register_dataset
+from utils.baca_file import iter_file_chunks
+from utils.ingest import scan_upload, prepare_chunk, iter_prepared_chunks, upload_column_types
+from db_config import get_engine, get_retention_days
+from utils.retention import register_dataset, dataset_exists, catalog_entry, register_append
+from utils.model_store import get_model
+from utils.incremental import append_rows
+from utils.cache import get_cluster_cache, get_map_cache
+from utils.checksum import ChunkDigest
+from utils.db_writer import bulk_write, infer_column_types
+from sqlalchemy import inspect
+
+PREVIEW_ROWS = 5
 
 def clean_column_name(name: str) -> str:
     cleaned_name = re.sub(r'[\s()\/]+', '_', name)
@@ -23,17 +32,74 @@ def clean_table_name(name: str) -> str:
         cleaned_name = 'default_table'
     return cleaned_name.lower()
 
-def table_exists(engine, schema: str, table_name: str) -> bool:
-    with engine.connect() as conn:
-        q = text("""
-            SELECT COUNT(*) FROM information_schema.tables
-            WHERE table_schema = :schema AND table_name = :name
-        """)
-        return bool(conn.execute(q, {"schema": schema, "name": table_name}).scalar())
-
-def save_dataset(engine, table_name: str, df: pd.DataFrame):
-    df.to_sql(table_name, con=engine, index=False, if_exists='replace')
-    register_dataset(engine, table_name, retention_days=get_retention_days())
+def table_exists(engine, table_name: str) -> bool:
+    # lookup primary key di katalog _datasets_meta dulu; tabel di luar katalog
+    # (tabel lama sebelum katalog ada) dicek ke DB sekali per nama per sesi, agar rerun
+    # saat nama baru diketik tidak query information_schema lagi
+    if dataset_exists(engine, table_name):
+        return True
+    absent = st.session_state.setdefault("upload_absent_tables", set())
+    if table_name in absent:
+        return False
+    if inspect(engine).has_table(table_name):
+        return True
+    absent.add(table_name)
+    return False
+
+def is_reserved_table_name(table_name: str) -> bool:
+    # awalan "_" = tabel internal (_datasets_meta, _cluster_models), "__" = staging bulk_write,
+    # akhiran "_clustered" = hasil clustering dataset lain
+    return table_name.startswith('_') or '__' in table_name or table_name.endswith('_clustered')
+
+def save_dataset(engine, table_name: str, df: pd.DataFrame | Iterable[pd.DataFrame],
+                 column_types: dict | None = None):
+    """df boleh berupa DataFrame atau iterable chunk DataFrame (wajib column_types)."""
+    if column_types is None:
+        column_types = infer_column_types(df)
+    chunks = [df] if isinstance(df, pd.DataFrame) else df
+    # ringkasan katalog (jumlah baris, ukuran, checksum) dihitung sambil data ditulis
+    digest = ChunkDigest(column_types)
+    bulk_write(engine, table_name, digest.tee(chunks), column_types=column_types, if_exists='replace')
+    register_dataset(engine, table_name, retention_days=get_retention_days(),
+                     row_count=digest.rows, column_types=column_types,
+                     byte_size=digest.nbytes, checksum=digest.checksum)
+    st.session_state.get("upload_absent_tables", set()).discard(table_name)
+    # hasil sweep lama untuk tabel ini tidak lagi relevan
+    get_cluster_cache().invalidate(predicate=lambda k: k.startswith(f"{table_name}__"))
+
+def append_dataset(engine, table_name: str, chunks: Iterable[pd.DataFrame], column_types: dict):
+    """
+    Tambahkan baris ke dataset yang sudah ada. Bila dataset sudah di-cluster, baris baru
+    diberi label dengan scaler + centroid tersimpan dan ditambahkan ke `<tabel>_clustered`.
+    Return: hasil append_rows (jumlah baris & metrik drift).
+    """
+    entry = catalog_entry(engine, table_name)
+    expected = (entry or {}).get("column_schema") or {}
+    if expected and set(expected) != set(column_types):
+        beda = sorted(set(expected) ^ set(column_types))
+        raise ValueError("Kolom file tidak sama dengan dataset: " + ", ".join(beda))
+    model = get_model(engine, table_name) if entry and entry.get("clustered_table") else None
+    if model is not None:
+        missing = [c for c in ["KECAMATAN"] + model.features if c not in column_types]
+        if missing:
+            raise ValueError("Kolom fitur clustering tidak ada di file: " + ", ".join(missing))
+    result = append_rows(engine, table_name, chunks, column_types, model)
+    register_append(engine, table_name, result["rows"], result["nbytes"], clustered=model is not None)
+    get_cluster_cache().invalidate(predicate=lambda k: k.startswith(f"{table_name}__"))
+    if model is not None:
+        get_map_cache().invalidate(predicate=lambda k: k.startswith(f"{table_name}_clustered@"))
+    return result
+
+def _show_drift(drift: dict | None):
+    if drift is None:
+        st.info("ℹ️ Dataset belum di-cluster; jalankan clustering untuk memberi label baris baru.")
+        return
+    st.caption(
+        f"Drift: jarak rata-rata ke centroid {drift['ratio']:.2f}× kondisi saat fit, "
+        f"{drift['out_of_range'] * 100:.1f}% baris di luar rentang data lama."
+    )
+    if drift["refit"]:
+        st.warning("⚠️ Data baru cukup berbeda dari data saat clustering. Disarankan menjalankan clustering ulang.")
 
 def show_upload():
     st.markdown('<h2 class="section-header">📁 Upload Data</h2>', unsafe_allow_html=True)
@@ -43,46 +109,57 @@ def show_upload():
     if uploaded_file is None:
         return
 
+    # Header + beberapa baris pertama untuk validasi kolom (tanpa memuat seluruh file)
     try:
-        data = read_file(uploaded_file)
-        st.session_state.data = data
+        head = next(iter_file_chunks(uploaded_file, PREVIEW_ROWS), None)
     except Exception as e:
         st.error(f"❌ Gagal membaca file: {e}")
         return
 
-    if data.empty:
+    if head is None or head.empty:
         st.error("❌ Data kosong.")
         return
 
-    data_cols_lower = [c.lower() for c in data.columns]
+    data_cols_lower = [str(c).lower() for c in head.columns]
     if 'kecamatan' not in data_cols_lower:
         st.error("❌ Kolom KECAMATAN wajib ada.")
         return
-    kecamatan_col = next(c for c in data.columns if c.lower() == 'kecamatan')
+    kecamatan_col = next(c for c in head.columns if str(c).lower() == 'kecamatan')
     if kecamatan_col != 'KECAMATAN':
-        data = data.rename(columns={kecamatan_col: 'KECAMATAN'})
         st.info(f"ℹ️ Kolom '{kecamatan_col}' diubah menjadi 'KECAMATAN'.")
 
-    mapping = {}
-    for col in data.columns:
-        if col != 'KECAMATAN':
-            mapping[col] = clean_column_name(col)
-    if mapping:
-        data = data.rename(columns=mapping)
-
-    # --- Imputasi NaN & nol ke mean (kolom numerik)
-    num_cols = data.select_dtypes(include='number').columns.tolist()
-    filled_cols = []
-    for col in num_cols:
-        vals = data[col].tolist()
-        valid = [float(v) for v in vals if (pd.notna(v) and v != 0)]
-        mean_v = (sum(valid) / len(valid)) if valid else 0.0
-        if data[col].isna().any() or (data[col] == 0).any():
-            data[col] = [mean_v if (pd.isna(v) or v == 0) else v for v in vals]
-            filled_cols.append(col)
-        data[col] = [round(float(v), 2) for v in data[col]]
-
-    st.dataframe(data.head(), use_container_width=True)
+    mapping = {kecamatan_col: 'KECAMATAN'}
+    for col in head.columns:
+        if col != kecamatan_col:
+            mapping[col] = clean_column_name(str(col))
+
+    # --- Pass pertama (streaming): mean kolom numerik untuk imputasi NaN & nol.
+    # Disimpan di session agar rerun widget tidak membaca ulang file.
+    scan_key = (getattr(uploaded_file, "file_id", None) or uploaded_file.name, uploaded_file.size)
+    stats = st.session_state.get("upload_scan")
+    if not stats or stats.get("key") != scan_key:
+        try:
+            with st.spinner("Memindai file..."):
+                stats = scan_upload(uploaded_file, mapping)
+        except Exception as e:
+            st.error(f"❌ Gagal membaca file: {e}")
+            return
+        stats["key"] = scan_key
+        st.session_state.upload_scan = stats
+
+    if stats["n_rows"] == 0:
+        st.error("❌ Data kosong.")
+        return
+
+    preview = prepare_chunk(head.head(), stats)
+    st.session_state.data = preview
+    st.dataframe(preview, use_container_width=True)
+    st.caption(f"{stats['n_rows']:,} baris, {len(stats['columns'])} kolom.")
+
+    # Pass kedua dijalankan saat menyimpan: chunk diimputasi lalu langsung ditulis ke DB
+    column_types = upload_column_types(stats)
+    def _chunks():
+        return iter_prepared_chunks(uploaded_file, stats)
 
     default_table = clean_table_name(uploaded_file.name.rsplit('.', 1)[0])
     table_name = st.text_input("📝 Nama tabel:", value=default_table)
@@ -94,26 +171,29 @@ def show_upload():
     if table_name.lower() in reserved_words or len(table_name) < 3:
         st.error("❌ Nama tabel tidak valid.")
         return
+    if is_reserved_table_name(table_name):
+        st.error("❌ Nama tabel dicadangkan (awalan '_', mengandung '__', atau berakhiran '_clustered').")
+        return
 
     try:
         engine = get_engine()
-        schema = get_db_name()
     except Exception as e:
         st.error(f"❌ {e}")
         return
 
     try:
-        exists = table_exists(engine, schema, table_name)
+        exists = table_exists(engine, table_name)
     except Exception as e:
         st.error(f"❌ Gagal memeriksa tabel: {e}")
         return
 
     if exists:
         st.warning(f"⚠️ Tabel `{table_name}` sudah ada.")
-        c1, c2, c3 = st.columns(3)
+        c1, c2, c3, c4 = st.columns(4)
         btn_overwrite = c1.button("💾 Lanjutkan Overwrite", use_container_width=True, key="btn_overwrite")
-        btn_copy      = c2.button("📄 Simpan Sebagai Salinan", use_container_width=True, key="btn_copy")
-        btn_cancel    = c3.button("❌ Batalkan", use_container_width=True, key="btn_cancel")
+        btn_append    = c2.button("➕ Tambahkan Baris", use_container_width=True, key="btn_append")
+        btn_copy      = c3.button("📄 Simpan Sebagai Salinan", use_container_width=True, key="btn_copy")
+        btn_cancel    = c4.button("❌ Batalkan", use_container_width=True, key="btn_cancel")
 
         if btn_cancel:
             st.info("Upload dibatalkan.")
@@ -121,7 +201,7 @@ def show_upload():
 
         if btn_overwrite:
             try:
-                save_dataset(engine, table_name, data)
+                save_dataset(engine, table_name, _chunks(), column_types)
                 st.session_state.selected_dataset = table_name
                 st.success(f"✅ Ditimpa sebagai `{table_name}`")
                 st.info("Mengalihkan ke halaman Clustering...")
@@ -131,10 +211,21 @@ def show_upload():
                 st.error(f"❌ Gagal menyimpan (overwrite): {e}")
             return
 
+        if btn_append:
+            try:
+                with st.spinner("Menambahkan baris..."):
+                    result = append_dataset(engine, table_name, _chunks(), column_types)
+                st.session_state.selected_dataset = table_name
+                st.success(f"✅ {result['rows']:,} baris ditambahkan ke `{table_name}`")
+                _show_drift(result["drift"])
+            except Exception as e:
+                st.error(f"❌ Gagal menambahkan baris: {e}")
+            return
+
         if btn_copy:
             ver_name = f"{table_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
             try:
-                save_dataset(engine, ver_name, data)
+                save_dataset(engine, ver_name, _chunks(), column_types)
                 st.session_state.selected_dataset = ver_name
                 st.success(f"✅ Disalin sebagai `{ver_name}`")
                 st.info("Mengalihkan ke halaman Clustering...")
@@ -147,7 +238,7 @@ def show_upload():
 
     if st.button("💾 Simpan ke Database", use_container_width=True, key="btn_save_new"):
         try:
-            save_dataset(engine, table_name, data)
+            save_dataset(engine, table_name, _chunks(), column_types)
             st.session_state.selected_dataset = table_name
             st.success(f"✅ Dataset tersimpan sebagai `{table_name}`")
             st.info("Mengalihkan ke halaman Clustering...")
@@ -0,0 +1,180 @@
+"""
+Benchmark mesin clustering (KMeansCustom, MinMaxScaler, compute_dbi, label deskriptif).
+
+Data sintetis berupa blob Gaussian dibangkitkan untuk setiap kombinasi n x d x k,
+lalu diukur: waktu fit/predict/sweep Elbow/labeling, puncak memori (tracemalloc),
+dan jumlah iterasi sampai konvergen. Hasil ditulis ke file JSON agar bisa
+dibandingkan antar-run (default di benchmarks/results/, tidak ikut di-commit).
+
+Contoh (dari root repo):
+    python -m benchmarks.bench_clustering --grid quick --out benchmarks/results/bench_quick.json
+    python -m benchmarks.bench_clustering --grid full --algorithm hamerly --out benchmarks/results/bench_full.json
+    python -m benchmarks.bench_clustering --grid quick --compare benchmarks/results/bench_quick.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.algoritma import (
+    KMeansCustom,
+    MinMaxScaler,
+    sweep_k,
+    compute_dbi,
+    apply_descriptive_labels,
+)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+GRIDS: Dict[str, Dict[str, List[int]]] = {
+    "quick": {"n": [1_000, 10_000], "d": [2, 10], "k": [2, 5]},
+    "full": {"n": [1_000, 10_000, 100_000, 1_000_000], "d": [2, 10, 50], "k": [2, 5, 10]},
+}
+
+def make_blobs(n: int, d: int, k: int, seed: int = 0) -> np.ndarray:
+    """Blob Gaussian: k pusat acak di [0, 100]^d, simpangan 5."""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(0, 100, size=(k, d))
+    which = rng.integers(0, k, size=n)
+    return centers[which] + rng.normal(0, 5, size=(n, d))
+
+def measure(fn: Callable[[], Any], repeat: int = 1) -> Tuple[Any, float, float]:
+    """Jalankan fn `repeat` kali -> (hasil terakhir, detik terbaik, puncak memori MB)."""
+    best = float("inf")
+    peak = 0
+    result = None
+    for _ in range(repeat):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return result, best, peak / 1e6
+
+def bench_config(n: int, d: int, k: int, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    X_raw = make_blobs(n, d, k, seed=args.seed)
+    params = {
+        "random_state": args.seed,
+        "init": args.init,
+        "n_init": args.n_init,
+        "algorithm": args.algorithm,
+        "batch_size": args.batch_size,
+    }
+    rows: List[Dict[str, Any]] = []
+
+    def record(op: str, seconds: float, peak_mb: float, **extra: Any):
+        rows.append({"n": n, "d": d, "k": k, "op": op, "seconds": round(seconds, 6),
+                     "peak_mb": round(peak_mb, 3), **extra})
+
+    X, sec, mem = measure(lambda: MinMaxScaler().fit_transform(X_raw), args.repeat)
+    record("scale", sec, mem)
+
+    model, sec, mem = measure(lambda: KMeansCustom(n_clusters=k, **params).fit(X), args.repeat)
+    record("fit", sec, mem, n_iter=model.n_iter_, inertia=model.inertia_)
+
+    labels, sec, mem = measure(lambda: model.predict(X), args.repeat)
+    record("predict", sec, mem)
+
+    _, sec, mem = measure(lambda: compute_dbi(X, labels, model.centroids, k), args.repeat)
+    record("dbi", sec, mem)
+
+    feats = [f"f{i}" for i in range(d)]
+    df = pd.DataFrame(X_raw, columns=feats)
+    df["Cluster"] = labels
+    _, sec, mem = measure(lambda: apply_descriptive_labels(df, feats, "Cluster", k), args.repeat)
+    record("labeling", sec, mem)
+
+    if n <= args.sweep_max_n:
+        k_values = list(range(1, args.sweep_max_k + 1))
+        sweep, sec, mem = measure(lambda: sweep_k(X, k_values, n_jobs=args.n_jobs, **params), 1)
+        record("elbow_sweep", sec, mem, k_max=args.sweep_max_k,
+               n_iter_total=int(sum(r["n_iter"] for r in sweep.values())))
+    return rows
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+def compare(current: List[Dict[str, Any]], baseline_path: str):
+    """Cetak rasio waktu run ini terhadap file hasil sebelumnya (>1 = lebih lambat)."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    base = {(r["n"], r["d"], r["k"], r["op"]): r["seconds"] for r in baseline}
+    print(f"\n{'n':>9} {'d':>3} {'k':>3} {'op':<12} {'base s':>10} {'now s':>10} {'ratio':>7}")
+    for r in current:
+        key = (r["n"], r["d"], r["k"], r["op"])
+        if key not in base or base[key] == 0:
+            continue
+        print(f"{r['n']:>9} {r['d']:>3} {r['k']:>3} {r['op']:<12} {base[key]:>10.4f} "
+              f"{r['seconds']:>10.4f} {r['seconds'] / base[key]:>7.2f}")
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Benchmark mesin clustering.")
+    p.add_argument("--grid", choices=sorted(GRIDS), default="quick")
+    p.add_argument("--n", type=int, nargs="+", help="override daftar n")
+    p.add_argument("--d", type=int, nargs="+", help="override daftar d")
+    p.add_argument("--k", type=int, nargs="+", help="override daftar k")
+    p.add_argument("--algorithm", choices=["lloyd", "hamerly"], default="lloyd")
+    p.add_argument("--init", choices=["random", "k-means++"], default="k-means++")
+    p.add_argument("--n-init", type=int, default=1)
+    p.add_argument("--batch-size", type=int, default=None, help="aktifkan mode mini-batch")
+    p.add_argument("--n-jobs", type=int, default=None, help="worker untuk sweep Elbow")
+    p.add_argument("--sweep-max-n", type=int, default=100_000, help="lewati sweep Elbow untuk n lebih besar")
+    p.add_argument("--sweep-max-k", type=int, default=10)
+    p.add_argument("--repeat", type=int, default=1)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--out", default=os.path.join(RESULTS_DIR, "bench_results.json"))
+    p.add_argument("--compare", help="file JSON hasil run sebelumnya untuk dibandingkan")
+    return p.parse_args(argv)
+
+def main(argv: List[str] | None = None):
+    args = parse_args(argv)
+    grid = GRIDS[args.grid]
+    ns, ds, ks = args.n or grid["n"], args.d or grid["d"], args.k or grid["k"]
+
+    results: List[Dict[str, Any]] = []
+    for n in ns:
+        for d in ds:
+            for k in ks:
+                rows = bench_config(n, d, k, args)
+                results.extend(rows)
+                summary = ", ".join(f"{r['op']}={r['seconds']:.3f}s" for r in rows)
+                print(f"n={n:<8} d={d:<3} k={k:<3} {summary}", flush=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Hasil disimpan ke {args.out}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,10 @@
 import os
 import streamlit as st
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 
 DATA_RETENTION_DAYS = int(os.getenv("DATA_RETENTION_DAYS", "365"))
+RETENTION_SWEEP_SECONDS = int(os.getenv("RETENTION_SWEEP_SECONDS", "3600"))
 
 @st.cache_resource
 def get_engine():
@@ -13,7 +15,9 @@ def get_engine():
     else:
         raise Exception("❌ Tidak ada konfigurasi DB ditemukan.")
 
-    engine = create_engine(url, pool_pre_ping=True, pool_recycle=3600, future=True)
+    # izinkan LOAD DATA LOCAL INFILE untuk bulk load (dipakai hanya bila server juga mengizinkan)
+    connect_args = {"local_infile": True} if make_url(url).drivername == "mysql+pymysql" else {}
+    engine = create_engine(url, pool_pre_ping=True, pool_recycle=3600, future=True, connect_args=connect_args)
     with engine.connect() as conn:
         conn.exec_driver_sql("SELECT 1")
     return engine
@@ -25,3 +29,6 @@ def get_db_name():
 
 def get_retention_days():
     return DATA_RETENTION_DAYS
+
+def get_retention_sweep_seconds():
+    return RETENTION_SWEEP_SECONDS
@@ -4,6 +4,8 @@ from Laman.upload import show_upload
 from Laman.dataset import show_dataset
 from Laman.hasil_cluster import show_clustering
 from Laman.peta import show_map
+from db_config import get_engine, get_retention_sweep_seconds
+from utils.retention import start_retention_sweeper
 
 st.set_page_config(
     page_title="Aplikasi Clustering Potensi Perkebunan",
@@ -12,6 +14,12 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Sweeper retensi berjalan di thread latar, satu kali per proses (bukan per render)
+try:
+    start_retention_sweeper(get_engine(), interval=get_retention_sweep_seconds())
+except Exception:
+    pass  # koneksi DB gagal: tiap halaman menampilkan pesan errornya sendiri
+
 # Inisialisasi session_state untuk menu
 if "menu" not in st.session_state:
     st.session_state.menu = "Upload Dataset"
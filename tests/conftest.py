@@ -0,0 +1,5 @@
+import os
+import sys
+
+# modul aplikasi diimpor relatif terhadap root repo (from utils.x import ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
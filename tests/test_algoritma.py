@@ -0,0 +1,72 @@
+import json
+
+import numpy as np
+import pytest
+
+from utils.algoritma import KMeansCustom, MinMaxScaler
+
+def _blobs(n_per: int = 400, k: int = 5, d: int = 3, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.random((k, d)) * 10
+    return np.concatenate([c + rng.normal(0, 0.8, (n_per, d)) for c in centers])
+
+@pytest.mark.parametrize("init", ["random", "k-means++"])
+def test_hamerly_matches_lloyd(init):
+    """Hamerly hanya melewati jarak yang pasti tidak mengubah label: hasil harus identik."""
+    X = _blobs()
+    lloyd = KMeansCustom(5, random_state=7, init=init, n_init=3, algorithm="lloyd").fit(X)
+    hamerly = KMeansCustom(5, random_state=7, init=init, n_init=3, algorithm="hamerly").fit(X)
+    assert hamerly.n_iter_ == lloyd.n_iter_
+    assert hamerly.stop_reason_ == lloyd.stop_reason_
+    np.testing.assert_array_equal(hamerly.labels, lloyd.labels)
+    np.testing.assert_allclose(hamerly.centroids, lloyd.centroids, rtol=0, atol=1e-12)
+    assert hamerly.inertia_ == pytest.approx(lloyd.inertia_, rel=1e-12)
+
+def test_minibatch_stops_before_max_iters():
+    # konvergensi EWA / tanpa perbaikan harus berhenti jauh sebelum batas iterasi
+    X = np.tile(_blobs(), (20, 1))
+    model = KMeansCustom(5, random_state=1, init="k-means++", batch_size=256, max_iters=500).fit(X)
+    assert model.stop_reason_ in ("tol", "no_improvement")
+    assert model.n_iter_ < 500
+    lloyd = KMeansCustom(5, random_state=1, init="k-means++", n_init=3).fit(X)
+    assert model.inertia_ <= lloyd.inertia_ * 1.05
+
+@pytest.mark.parametrize("params", [
+    {"algorithm": "lloyd"},
+    {"algorithm": "hamerly", "init": "k-means++"},
+    {"batch_size": 128, "max_iters": 300},
+])
+def test_kmeans_state_roundtrip(params):
+    X = _blobs(n_per=200)
+    model = KMeansCustom(4, random_state=3, **params).fit(X)
+    # state harus bisa lewat JSON (disimpan di _cluster_models)
+    state = json.loads(json.dumps(model.get_state()))
+    restored = KMeansCustom.from_state(state)
+    assert restored.get_state() == state
+    np.testing.assert_array_equal(restored.centroids, model.centroids)
+    np.testing.assert_array_equal(restored.predict(X), model.predict(X))
+
+    # partial_fit pada model hasil restore melanjutkan dari centroid tersimpan
+    more = _blobs(n_per=50, seed=9)
+    model.partial_fit(more)
+    restored.partial_fit(more)
+    np.testing.assert_allclose(restored.centroids, model.centroids)
+
+def test_partial_fit_restored_without_counts():
+    model = KMeansCustom(3, random_state=0).fit(_blobs(n_per=100, k=3))
+    state = {**model.get_state(), "counts": None}
+    restored = KMeansCustom.from_state(state)
+    restored.partial_fit(_blobs(n_per=20, k=3, seed=5))
+    assert restored.centroids.shape == model.centroids.shape
+
+def test_get_state_requires_fit():
+    with pytest.raises(ValueError):
+        KMeansCustom(3).get_state()
+
+def test_scaler_state_roundtrip():
+    X = _blobs(n_per=50)
+    X[3, 1] = np.nan
+    scaler = MinMaxScaler()
+    scaled = scaler.fit_transform(X)
+    restored = MinMaxScaler.from_state(json.loads(json.dumps(scaler.get_state())))
+    np.testing.assert_allclose(restored.transform(X), scaled)
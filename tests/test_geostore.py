@@ -0,0 +1,77 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import utils.geostore as geostore
+from utils.geostore import GeoStore, build_geo_store, open_geo_store
+
+def _square(x, y, s):
+    return [[x, y], [x + s, y], [x + s, y + s], [x, y + s], [x, y]]
+
+FEATURES = [
+    {"type": "Feature",
+     "properties": {"WADMKC": "Tapalang Barat", "luas": 1234.5, "kode": None, "tags": ["a", "é"]},
+     "geometry": {"type": "Polygon", "coordinates": [_square(119.1, -2.9, 0.1)]}},
+    {"type": "Feature",
+     "properties": {"nm_kecamatan": "Mamuju", "penduduk": 60000},
+     "geometry": {"type": "MultiPolygon",
+                  "coordinates": [[_square(119.2, -2.9, 0.1)], [_square(119.5, -2.5, 0.05)]]}},
+    {"type": "Feature", "properties": {"name": "titik"},
+     "geometry": {"type": "Point", "coordinates": [119.0, -2.0]}},
+]
+
+def _ring_key(ring, decimals=6):
+    """Ring sebagai siklus titik (tanpa titik penutup, diputar ke titik terkecil)."""
+    pts = [tuple(np.round(p, decimals)) for p in ring[:-1]]
+    i = pts.index(min(pts))
+    return tuple(pts[i:] + pts[:i])
+
+def _polygons(geometry):
+    return [geometry["coordinates"]] if geometry["type"] == "Polygon" else geometry["coordinates"]
+
+@pytest.fixture
+def geojson_path(tmp_path):
+    path = tmp_path / "wilayah.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": FEATURES}, ensure_ascii=False),
+                    encoding="utf-8")
+    return str(path)
+
+def test_roundtrip_properties_and_names(geojson_path, tmp_path):
+    store = GeoStore(build_geo_store(geojson_path, str(tmp_path / "wilayah.geostore")))
+    assert len(store) == len(FEATURES)
+    for i, feat in enumerate(FEATURES):
+        assert store.properties(i) == feat["properties"]
+    assert store.names == ["Tapalang Barat", "Mamuju", "titik"]
+
+def test_roundtrip_geometry(geojson_path, tmp_path):
+    store = GeoStore(build_geo_store(geojson_path, str(tmp_path / "wilayah.geostore")))
+    for i, feat in enumerate(FEATURES):
+        geom = store.geometry(i)
+        assert geom["type"] == feat["geometry"]["type"]
+        if geom["type"] == "Point":
+            assert geom == feat["geometry"]
+            continue
+        got = [[_ring_key(r) for r in poly] for poly in _polygons(geom)]
+        want = [[_ring_key(r) for r in poly] for poly in _polygons(feat["geometry"])]
+        assert got == want
+    assert store.to_geojson([1])["features"][0]["properties"] == FEATURES[1]["properties"]
+
+def test_open_rebuilds_when_source_changes(geojson_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(geostore, "GEOSTORE_DIR", str(tmp_path / "store"))
+    first = open_geo_store(geojson_path)
+    assert first.properties(0)["luas"] == 1234.5
+
+    changed = json.loads(json.dumps(FEATURES))
+    changed[0]["properties"]["luas"] = 99.0
+    with open(geojson_path, "w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": changed}, f)
+    os.utime(geojson_path, ns=(first.source["mtime_ns"] + 10**9,) * 2)
+    assert open_geo_store(geojson_path).properties(0)["luas"] == 99.0
+
+def test_rejects_non_store_file(tmp_path):
+    path = tmp_path / "bukan.geostore"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        GeoStore(str(path))
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from utils.topology import LOD_LEVELS, Topology, level_for_zoom, simplify_dp
+
+def _polygon(ring):
+    return {"type": "Feature", "properties": {}, "geometry": {"type": "Polygon", "coordinates": [ring]}}
+
+def _two_neighbours(seed: int = 3):
+    """Dua poligon bertetangga dengan batas bersama bergerigi di sekitar x = 1."""
+    rng = np.random.default_rng(seed)
+    ys = np.linspace(0, 1, 201)
+    xs = 1 + rng.uniform(-0.001, 0.001, len(ys))
+    xs[0] = xs[-1] = 1
+    border = [[float(x), float(y)] for x, y in zip(xs, ys)]
+    left = [[0.0, 0.0]] + border + [[0.0, 1.0], [0.0, 0.0]]
+    right = [[2.0, 0.0], [2.0, 1.0]] + border[::-1] + [[2.0, 0.0]]
+    return {"type": "FeatureCollection", "features": [_polygon(left), _polygon(right)]}
+
+def _outer_ring(geometry):
+    coords = geometry["coordinates"]
+    return coords[0] if geometry["type"] == "Polygon" else coords[0][0]
+
+@pytest.mark.parametrize("level", list(LOD_LEVELS))
+def test_shared_border_identical_on_both_sides(level):
+    topo = Topology.from_geojson(_two_neighbours())
+    left = {tuple(p) for p in _outer_ring(topo.geometry(0, level)) if p[0] > 0.5}
+    right = {tuple(p) for p in _outer_ring(topo.geometry(1, level)) if p[0] < 1.5}
+    # titik batas yang dipertahankan sama persis di kedua sisi -> tidak ada celah/tumpang tindih
+    assert left == right
+    assert len(left) >= 2
+
+def test_levels_reduce_points_monotonically():
+    topo = Topology.from_geojson(_two_neighbours())
+    counts = [topo.n_points(level) for level in LOD_LEVELS]
+    assert counts == sorted(counts)
+    assert counts[0] < counts[-1]
+
+def test_full_level_keeps_original_coordinates():
+    fc = _two_neighbours()
+    topo = Topology.from_geojson(fc)
+    original = np.array(fc["features"][0]["geometry"]["coordinates"][0][:-1])
+    full = np.array(_outer_ring(topo.geometry(0, "penuh"))[:-1])
+    assert len(full) == len(original)
+    # setiap titik asli ada di ring penuh, bergeser paling jauh satu langkah grid kuantisasi
+    dist = np.abs(original[:, None, :] - full[None, :, :]).max(axis=2).min(axis=1)
+    assert dist.max() <= topo.scale.max()
+
+def test_simplified_ring_stays_valid():
+    # segitiga kecil jauh di bawah toleransi tetap menjadi ring tertutup dengan >= 4 titik
+    tiny = [[0.0, 0.0], [1e-5, 0.0], [0.0, 1e-5], [0.0, 0.0]]
+    topo = Topology.from_geojson({"features": [_polygon(tiny)]})
+    ring = _outer_ring(topo.geometry(0, "rendah"))
+    assert len(ring) >= 4
+    assert ring[0] == ring[-1]
+
+def test_simplify_dp_keeps_endpoints_and_corners():
+    pts = np.array([[0, 0], [1, 0.0001], [2, 0], [2, 1], [2, 2]], dtype=float)
+    keep = simplify_dp(pts, tolerance=0.01)
+    assert list(keep) == [0, 2, 4]
+
+def test_level_for_zoom():
+    assert level_for_zoom(8) == "rendah"
+    assert level_for_zoom(10) == "sedang"
+    assert level_for_zoom(12) == "tinggi"
+    assert level_for_zoom(14) == "penuh"
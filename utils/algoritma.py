@@ -1,265 +1,740 @@
 from __future__ import annotations
+import os
 import random
-from typing import Sequence, List, Dict, Any, Tuple
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Sequence, List, Dict, Any, Tuple, Callable
+
+import numpy as np
 
 __all__ = [
     "MinMaxScaler",
     "KMeansCustom",
+    "sweep_k",
+    "elbow_k",
     "compute_dbi",
     "compute_cluster_means",
+    "cluster_order",
     "get_cluster_labels",
     "apply_descriptive_labels",
 ]
 
+# konversi list/ndarray/DataFrame ke array 2D float (tanpa salin bila sudah float)
+def _to_float_array(data: Any, dtype: Any = None) -> np.ndarray:
+    if hasattr(data, "to_numpy"):
+        X = data.to_numpy(dtype=dtype or np.float64, na_value=np.nan)
+    elif isinstance(data, np.ndarray) and data.dtype.kind == "f" and dtype is None:
+        X = data
+    else:
+        X = np.asarray(data, dtype=dtype or np.float64)
+    if X.ndim != 2 or X.shape[0] == 0:
+        raise ValueError("Data kosong.")
+    return X
+
 # MinMaxScaler
 class MinMaxScaler:
-    def __init__(self):
-        self.min_vals: List[float] | None = None
-        self.max_vals: List[float] | None = None
-        self.means: List[float] | None = None
-        self._range: List[float] | None = None
-
-    def fit(self, data: Sequence[Sequence[float]]):
-        if not data:
-            raise ValueError("Data kosong.")
-        n_features = len(data[0])
-        self.min_vals = [float("inf")] * n_features
-        self.max_vals = [float("-inf")] * n_features
-        sums = [0.0] * n_features
-        counts = [0] * n_features
-
-        for row in data:
-            for i, v in enumerate(row):
-                if v is None or (isinstance(v, float) and v != v):  # NaN
-                    continue
-                if v < self.min_vals[i]: self.min_vals[i] = v
-                if v > self.max_vals[i]: self.max_vals[i] = v
-                sums[i] += v
-                counts[i] += 1
-
-        self.means = [(sums[i] / counts[i]) if counts[i] > 0 else 0.0 for i in range(n_features)]
-        for i in range(n_features):
-            if self.min_vals[i] == float("inf"): self.min_vals[i] = 0.0
-            if self.max_vals[i] == float("-inf"): self.max_vals[i] = 0.0
-
-        self._range = [self.max_vals[i] - self.min_vals[i] for i in range(n_features)]
+    def __init__(self, dtype: Any = np.float64):
+        # dtype keluaran transform; float32 menghemat separuh memori untuk data lebar
+        self.dtype = np.dtype(dtype)
+        self.min_vals: np.ndarray | None = None
+        self.max_vals: np.ndarray | None = None
+        self.means: np.ndarray | None = None
+        self._range: np.ndarray | None = None
+        self._reset()
+
+    def _reset(self):
+        self._min: np.ndarray | None = None
+        self._max: np.ndarray | None = None
+        self._sums: np.ndarray | None = None
+        self._counts: np.ndarray | None = None
+
+    def fit(self, data: Any):
+        self._reset()
+        return self.partial_fit(data)
+
+    # akumulasi statistik kolom per batch (NaN/None diabaikan)
+    def partial_fit(self, data: Any):
+        X = _to_float_array(data)
+        if self._sums is None:
+            n_features = X.shape[1]
+            self._min = np.full(n_features, np.inf)
+            self._max = np.full(n_features, -np.inf)
+            self._sums = np.zeros(n_features)
+            self._counts = np.zeros(n_features, dtype=np.int64)
+        elif X.shape[1] != self._sums.shape[0]:
+            raise ValueError("Jumlah kolom batch tidak sesuai dengan scaler.")
+
+        # fmin/fmax mengabaikan NaN; kolom yang seluruhnya NaN tetap NaN
+        bmin = np.fmin.reduce(X, axis=0).astype(np.float64)
+        bmax = np.fmax.reduce(X, axis=0).astype(np.float64)
+        np.fmin(self._min, bmin, out=self._min)
+        np.fmax(self._max, bmax, out=self._max)
+        self._sums += np.nansum(X, axis=0, dtype=np.float64)
+        self._counts += X.shape[0] - np.isnan(X).sum(axis=0)
+
+        seen = self._counts > 0
+        self.means = np.where(seen, self._sums / np.maximum(self._counts, 1), 0.0)
+        self.min_vals = np.where(seen, self._min, 0.0)
+        self.max_vals = np.where(seen, self._max, 0.0)
+        self._range = self.max_vals - self.min_vals
         return self
 
-    def transform(self, data: Sequence[Sequence[float]]) -> List[List[float]]:
+    def _check_fitted(self):
         if self.min_vals is None or self._range is None or self.means is None:
             raise ValueError("Scaler belum di-fit.")
-        out: List[List[float]] = []
-        for row in data:
-            scaled_row: List[float] = []
-            for i, v in enumerate(row):
-                if v is None or (isinstance(v, float) and v != v):
-                    v = self.means[i]
-                rng = self._range[i]
-                scaled_row.append(0.0 if rng == 0 else (v - self.min_vals[i]) / rng)
-            out.append(scaled_row)
+
+    # siapkan buffer keluaran; out boleh berupa data itu sendiri (in-place)
+    def _prepare_out(self, data: Any, out: np.ndarray | None) -> np.ndarray:
+        X = data if isinstance(data, np.ndarray) else _to_float_array(data)
+        if X.ndim != 2 or X.shape[1] != self.min_vals.shape[0]:
+            raise ValueError("Jumlah kolom data tidak sesuai dengan scaler.")
+        if out is None:
+            return np.array(X, dtype=self.dtype, order="C")
+        if out.shape != X.shape or out.dtype.kind != "f":
+            raise ValueError("Buffer out harus float dengan bentuk yang sama dengan data.")
+        if out is not X:
+            np.copyto(out, X, casting="unsafe")
+        return out
+
+    def transform(self, data: Any, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        NaN diisi mean kolom, lalu diskalakan ke [0, 1]. Kolom konstan menjadi 0.
+        Hasil ditulis ke out bila diberikan (mis. out=data untuk transform in-place).
+        """
+        self._check_fitted()
+        out = self._prepare_out(data, out)
+        nan_mask = np.isnan(out)
+        if nan_mask.any():
+            np.copyto(out, np.broadcast_to(self.means.astype(out.dtype), out.shape), where=nan_mask)
+        nonzero = self._range != 0
+        out -= self.min_vals.astype(out.dtype)
+        np.divide(out, self._range.astype(out.dtype), out=out, where=nonzero)
+        out[:, ~nonzero] = 0.0
         return out
 
-    def fit_transform(self, data: Sequence[Sequence[float]]) -> List[List[float]]:
-        return self.fit(data).transform(data)
+    def fit_transform(self, data: Any, out: np.ndarray | None = None) -> np.ndarray:
+        return self.fit(data).transform(data, out=out)
+
+    def inverse_transform(self, data: Any, out: np.ndarray | None = None) -> np.ndarray:
+        """Kembalikan nilai terskala (mis. centroid) ke satuan asli."""
+        self._check_fitted()
+        out = self._prepare_out(data, out)
+        out *= self._range.astype(out.dtype)
+        out += self.min_vals.astype(out.dtype)
+        return out
+
+    # parameter hasil fit dalam bentuk list (bisa disimpan sebagai JSON) dan sebaliknya
+    def get_state(self) -> Dict[str, Any]:
+        self._check_fitted()
+        return {
+            "dtype": self.dtype.name,
+            "min_vals": self.min_vals.tolist(),
+            "max_vals": self.max_vals.tolist(),
+            "means": self.means.tolist(),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "MinMaxScaler":
+        scaler = cls(dtype=state.get("dtype", "float64"))
+        scaler.min_vals = np.asarray(state["min_vals"], dtype=np.float64)
+        scaler.max_vals = np.asarray(state["max_vals"], dtype=np.float64)
+        scaler.means = np.asarray(state["means"], dtype=np.float64)
+        scaler._range = scaler.max_vals - scaler.min_vals
+        return scaler
+
+# jumlah baris per blok saat menghitung jarak (membatasi memori sementara)
+_CHUNK_ROWS = 65536
+
+# pergeseran centroid terbesar (jarak euclidean) antara dua iterasi
+def _max_shift(new: np.ndarray, old: np.ndarray) -> float:
+    diff = np.asarray(new, dtype=np.float64) - np.asarray(old, dtype=np.float64)
+    return float(np.sqrt(np.einsum("ij,ij->i", diff, diff)).max())
+
+# Batas worker process pool bersama: semua sesi & sweep dalam satu proses berbagi pool ini,
+# sehingga sesi bersamaan tidak melipatgandakan jumlah proses
+MAX_WORKERS = max(1, int(os.getenv("CLUSTER_MAX_WORKERS", str(min(os.cpu_count() or 1, 4)))))
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+def _is_parallel(n_jobs: int | None, n_items: int) -> bool:
+    return n_jobs is not None and n_jobs != 0 and n_jobs != 1 and n_items > 1 and MAX_WORKERS > 1
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    Process pool bersama, dibuat sekali per proses. Worker dimulai lewat forkserver (spawn bila
+    tidak tersedia), bukan fork: server Streamlit multi-thread dan memegang koneksi DB, dan fork
+    dari proses seperti itu bisa mewarisi lock yang sedang dipegang thread lain.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context(method))
+        return _pool
+
+def _drop_pool(pool: ProcessPoolExecutor):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+# Eksekusi paralel (urutan hasil selalu mengikuti urutan input).
+# n_jobs selain None/0/1 = pakai pool bersama (paling banyak MAX_WORKERS proses).
+def _parallel_map(fn: Callable, items: Sequence[Any], n_jobs: int | None = None) -> List[Any]:
+    if not _is_parallel(n_jobs, len(items)):
+        return [fn(it) for it in items]
+    pool = _get_pool()
+    try:
+        return list(pool.map(fn, items))
+    except BrokenProcessPool:
+        # worker mati (mis. kehabisan memori): pool dibuat ulang pada pemanggilan berikutnya
+        _drop_pool(pool)
+        raise
+
+# satu restart KMeans di worker (harus top-level agar bisa di-pickle)
+def _kmeans_restart(args: Tuple[Dict[str, Any], np.ndarray, int, int]):
+    params, X, seed, run = args
+    model = KMeansCustom(**params)
+    return model._single_fit(X, seed, run)
+
+# jarak kuadrat tiap titik ke tiap centroid (n x k), tanpa sqrt
+def _sq_dists(X: np.ndarray, cents: np.ndarray) -> np.ndarray:
+    d = np.empty((X.shape[0], cents.shape[0]), dtype=X.dtype)
+    for j, c in enumerate(cents):
+        diff = X - c
+        np.einsum("ij,ij->i", diff, diff, out=d[:, j])
+    return d
+
+# Assignment Hamerly: simpan batas atas (jarak ke centroid sendiri) dan batas
+# bawah (jarak ke centroid terdekat kedua) per titik, plus jarak antar centroid.
+# Jarak penuh hanya dihitung untuk titik yang batasnya tidak lagi menjamin
+# label tetap, sehingga hasilnya sama persis dengan Lloyd.
+class _HamerlyAssigner:
+    def __init__(self, X: np.ndarray):
+        self.X = X
+        self.labels: np.ndarray | None = None
+        self.upper: np.ndarray | None = None
+        self.lower: np.ndarray | None = None
+        self.prev: np.ndarray | None = None
+        # margin numerik agar galat pembulatan tidak pernah membuat titik salah dilewati
+        scale = float(np.abs(X).max()) * np.sqrt(X.shape[1])
+        self.margin = 1024 * np.finfo(X.dtype).eps * (1.0 + scale)
+
+    def _full(self, idx: np.ndarray | slice, cents: np.ndarray):
+        d2 = _sq_dists(self.X[idx], cents)
+        lab = d2.argmin(axis=1)
+        if cents.shape[0] > 1:
+            two = np.partition(d2, 1, axis=1)
+            low = np.sqrt(two[:, 1].astype(np.float64))
+        else:
+            low = np.full(d2.shape[0], np.inf)
+        up = np.sqrt(d2[np.arange(d2.shape[0]), lab].astype(np.float64))
+        return lab, up, low
+
+    def __call__(self, cents: np.ndarray) -> np.ndarray:
+        if self.labels is None:
+            self.labels, self.upper, self.lower = self._full(slice(None), cents)
+            self.prev = cents.astype(np.float64, copy=True)
+            return self.labels.copy()
+
+        # geser batas sesuai pergeseran centroid sejak iterasi sebelumnya
+        c64 = cents.astype(np.float64)
+        shift = np.sqrt(((c64 - self.prev) ** 2).sum(axis=1))
+        self.prev = c64
+        self.upper += shift[self.labels]
+        if shift.size > 1:
+            order = np.argsort(shift)
+            max_other = np.where(self.labels == order[-1], shift[order[-2]], shift[order[-1]])
+            self.lower -= max_other
+
+        # setengah jarak ke centroid lain terdekat
+        cc = np.sqrt(_sq_dists(c64, c64))
+        np.fill_diagonal(cc, np.inf)
+        half = 0.5 * cc.min(axis=1)
+        bound = np.maximum(half[self.labels], self.lower) - self.margin
+
+        cand = np.flatnonzero(self.upper + self.margin >= bound)
+        if cand.size:
+            # perketat batas atas dengan jarak aktual ke centroid sendiri
+            diff = self.X[cand] - cents[self.labels[cand]]
+            self.upper[cand] = np.sqrt(np.einsum("ij,ij->i", diff, diff).astype(np.float64))
+            cand = cand[self.upper[cand] + self.margin >= bound[cand]]
+        if cand.size:
+            lab, up, low = self._full(cand, cents)
+            self.labels[cand] = lab
+            self.upper[cand] = up
+            self.lower[cand] = low
+        return self.labels.copy()
 
 # KMeans
 class KMeansCustom:
-    def __init__(self, n_clusters: int = 3, max_iters: int = 100, random_state: int = 42):
+    def __init__(
+        self,
+        n_clusters: int = 3,
+        max_iters: int = 100,
+        random_state: int = 42,
+        dtype: Any = np.float64,
+        init: str = "random",
+        n_init: int = 1,
+        n_jobs: int | None = None,
+        algorithm: str = "lloyd",
+        batch_size: int | None = None,
+        tol: float = 1e-4,
+        max_no_improvement: int = 10,
+        callback: Callable[[Dict[str, Any]], Any] | None = None,
+    ):
+        if init not in ("random", "k-means++"):
+            raise ValueError("init harus 'random' atau 'k-means++'.")
+        if algorithm not in ("lloyd", "hamerly"):
+            raise ValueError("algorithm harus 'lloyd' atau 'hamerly'.")
         self.n_clusters = int(n_clusters)
         self.max_iters = int(max_iters)
         self.random_state = int(random_state)
-        self.centroids: List[List[float]] | None = None
-        self.labels: List[int] | None = None
-
-    # sqrt manual (Newton)
-    def _sqrt(self, x: float, eps: float = 1e-10, max_iter: int = 100) -> float:
-        if x < 0: raise ValueError("Tidak bisa akar bilangan negatif.")
-        if x == 0: return 0.0
-        g = x / 2.0
-        for _ in range(max_iter):
-            ng = 0.5 * (g + x / g)
-            if abs(ng - g) < eps: return ng
-            g = ng
-        return g
-
-    # jarak euclidean manual
-    def _euclid(self, a: Sequence[float], b: Sequence[float]) -> float:
-        s = 0.0
-        for x, y in zip(a, b):
-            d = x - y
-            s += d * d
-        return self._sqrt(s)
-
-    # inisialisasi centroid random uniform dalam rentang fitur
-    def _init_centroids(self, data: Sequence[Sequence[float]]) -> List[List[float]]:
-        random.seed(self.random_state)
-        n_features = len(data[0])
-        mins = [float("inf")] * n_features
-        maxs = [float("-inf")] * n_features
-        for r in data:
-            for i in range(n_features):
-                if r[i] < mins[i]: mins[i] = r[i]
-                if r[i] > maxs[i]: maxs[i] = r[i]
-        cents: List[List[float]] = []
-        for _ in range(self.n_clusters):
-            cents.append([random.uniform(mins[i], maxs[i]) for i in range(n_features)])
-        return cents
-
-    # assignment step
-    def _assign(self, data: Sequence[Sequence[float]], cents: Sequence[Sequence[float]]) -> List[int]:
-        labels: List[int] = []
-        for p in data:
-            best = 0
-            best_d = float("inf")
-            for i, c in enumerate(cents):
-                d = self._euclid(p, c)
-                if d < best_d:
-                    best_d = d
-                    best = i
-            labels.append(best)
+        self.dtype = np.dtype(dtype)
+        self.init = init
+        self.n_init = max(1, int(n_init))
+        self.n_jobs = n_jobs
+        self.algorithm = algorithm
+        self.batch_size = int(batch_size) if batch_size else None
+        self.tol = float(tol)  # batas pergeseran centroid terbesar untuk berhenti
+        # mini-batch: berhenti bila inertia batch (rata-rata bergerak) tidak membaik sekian batch
+        self.max_no_improvement = int(max_no_improvement)
+        self.callback = callback
+        self.centroids: np.ndarray | None = None
+        self.labels: np.ndarray | None = None
+        self.inertia_: float | None = None
+        self.n_iter_: int | None = None
+        self.converged_: bool | None = None
+        self.stop_reason_: str | None = None     # "converged" | "tol" | "no_improvement" | "max_iters"
+        self.history_: List[Dict[str, Any]] = []  # statistik per iterasi run terbaik
+        self.iter_times_: List[float] = []
+        self._counts: np.ndarray | None = None  # jumlah titik per centroid (mode partial_fit)
+
+    # konversi input ke array kontigu float64/float32
+    def _as_array(self, data: Any) -> np.ndarray:
+        X = np.ascontiguousarray(data, dtype=self.dtype)
+        if X.ndim != 2 or X.shape[0] == 0:
+            raise ValueError("Data harus 2 dimensi dan tidak kosong.")
+        return X
+
+    # parameter konstruktor untuk membuat salinan model di worker
+    def _params(self) -> Dict[str, Any]:
+        return {
+            "n_clusters": self.n_clusters,
+            "max_iters": self.max_iters,
+            "random_state": self.random_state,
+            "dtype": self.dtype,
+            "init": self.init,
+            "algorithm": self.algorithm,
+            "batch_size": self.batch_size,
+            "tol": self.tol,
+            "max_no_improvement": self.max_no_improvement,
+        }
+
+    # seed tiap restart: restart pertama = random_state, sisanya diturunkan deterministik
+    def _restart_seeds(self) -> List[int]:
+        extra = np.random.SeedSequence(self.random_state).generate_state(self.n_init - 1)
+        return [self.random_state] + [int(s) for s in extra]
+
+    # inisialisasi centroid sesuai opsi init
+    def _init_centroids(self, X: np.ndarray, seed: int | None = None) -> np.ndarray:
+        seed = self.random_state if seed is None else seed
+        if self.init == "k-means++":
+            return self._init_kmeanspp(X, seed)
+        return self._init_uniform(X, seed)
+
+    # random uniform dalam rentang fitur
+    # (urutan undian sama dengan versi list agar label identik per seed)
+    def _init_uniform(self, X: np.ndarray, seed: int) -> np.ndarray:
+        rng = random.Random(seed)
+        mins = X.min(axis=0).tolist()
+        maxs = X.max(axis=0).tolist()
+        n_features = X.shape[1]
+        cents = [[rng.uniform(mins[i], maxs[i]) for i in range(n_features)]
+                 for _ in range(self.n_clusters)]
+        return np.asarray(cents, dtype=X.dtype)
+
+    # k-means++ (greedy): beberapa kandidat diundi proporsional jarak kuadrat
+    # terdekat, dipilih yang paling menurunkan total jarak
+    def _init_kmeanspp(self, X: np.ndarray, seed: int) -> np.ndarray:
+        rng = np.random.default_rng(seed)
+        n = X.shape[0]
+        n_trials = 2 + int(np.log(self.n_clusters))
+        idx = [int(rng.integers(n))]
+        closest = self._sq_dists(X, X[idx]).ravel().astype(np.float64)
+        for _ in range(1, self.n_clusters):
+            total = closest.sum()
+            if total <= 0.0:
+                # semua titik sudah tepat di centroid
+                idx.append(int(rng.integers(n)))
+                continue
+            cand = np.searchsorted(np.cumsum(closest), rng.random(n_trials) * total, side="right")
+            cand = np.minimum(cand, n - 1)
+            cand_d = np.minimum(closest[:, None], self._sq_dists(X, X[cand]))
+            best = int(cand_d.sum(axis=0).argmin())
+            idx.append(int(cand[best]))
+            closest = cand_d[:, best].astype(np.float64)
+        return np.ascontiguousarray(X[idx])
+
+    _sq_dists = staticmethod(_sq_dists)
+
+    # assignment step (per blok baris agar matriks jarak tetap kecil)
+    def _assign(self, X: np.ndarray, cents: np.ndarray) -> np.ndarray:
+        if X.shape[0] <= _CHUNK_ROWS:
+            return self._sq_dists(X, cents).argmin(axis=1)
+        labels = np.empty(X.shape[0], dtype=np.intp)
+        for start in range(0, X.shape[0], _CHUNK_ROWS):
+            stop = start + _CHUNK_ROWS
+            labels[start:stop] = self._sq_dists(X[start:stop], cents).argmin(axis=1)
         return labels
 
     # update step
-    def _update(self, data: Sequence[Sequence[float]], labels: Sequence[int]) -> List[List[float]]:
-        new_cents: List[List[float]] = []
-        n_features = len(data[0])
-        for cid in range(self.n_clusters):
-            pts = [data[i] for i in range(len(data)) if labels[i] == cid]
-            if pts:
-                new_cents.append([sum(p[j] for p in pts) / len(pts) for j in range(n_features)])
-            else:
-                new_cents.append(self.centroids[cid])  # pertahankan jika kosong
-        return new_cents
+    def _update(self, X: np.ndarray, labels: np.ndarray) -> np.ndarray:
+        k = self.n_clusters
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros((k, X.shape[1]), dtype=np.float64)
+        np.add.at(sums, labels, X)
+        new_cents = self.centroids.astype(np.float64, copy=True)  # pertahankan jika kosong
+        filled = counts > 0
+        new_cents[filled] = sums[filled] / counts[filled, None]
+        return new_cents.astype(X.dtype, copy=False)
 
     # jumlah kuadrat jarak intra-cluster (WCSS)
-    def _wcss(self, data: Sequence[Sequence[float]], labels: Sequence[int], cents: Sequence[Sequence[float]]) -> float:
+    def _wcss(self, data: Any, labels: Any, cents: Any) -> float:
+        X = np.asarray(data)
+        labels = np.asarray(labels)
+        cents = np.asarray(cents, dtype=np.float64)
         total = 0.0
-        for i in range(len(data)):
-            cid = labels[i]
-            d = self._euclid(data[i], cents[cid])
-            total += d * d
+        for start in range(0, X.shape[0], _CHUNK_ROWS):
+            stop = start + _CHUNK_ROWS
+            diff = X[start:stop].astype(np.float64) - cents[labels[start:stop]]
+            total += float(np.einsum("ij,ij->", diff, diff))
         return total
 
     # Elbow (k rekomendasi + daftar WCSS)
-    def _elbow_method(self, data: Sequence[Sequence[float]], max_k: int = 10) -> Tuple[int, List[float]]:
+    def _elbow_method(self, data: Any, max_k: int = 10) -> Tuple[int, List[float]]:
+        X = self._as_array(data)
         wcss_values: List[float] = []
-        best_k = 3
-        best_curve = float("-inf")
         for k in range(1, max_k + 1):
             self.n_clusters = k
-            self.fit(data)
-            wcss_values.append(self._wcss(data, self.labels, self.centroids))
-            if k >= 3:
-                d1 = wcss_values[-3] - wcss_values[-2]
-                d2 = wcss_values[-2] - wcss_values[-1]
-                curvature = d1 - d2
-                if curvature > best_curve:
-                    best_curve = curvature
-                    best_k = k - 1
-        return best_k, wcss_values
+            self.fit(X)
+            wcss_values.append(self._wcss(X, self.labels, self.centroids))
+        return elbow_k(list(range(1, max_k + 1)), wcss_values), wcss_values
 
-    # API publik
-    def fit(self, data: Sequence[Sequence[float]]):
-        self.centroids = self._init_centroids(data)
-        last_labels: List[int] | None = None
-        for _ in range(self.max_iters):
-            labels = self._assign(data, self.centroids)
-            new_cents = self._update(data, labels)
-            if new_cents == self.centroids and last_labels == labels:
+    # satu langkah mini-batch: centroid digeser ke rata-rata batch dengan
+    # learning rate per centroid = jumlah titik batch / total titik yang pernah masuk
+    # -> (labels, pergeseran terbesar, inertia batch per titik terhadap centroid sebelum update)
+    def _minibatch_step(self, Xb: np.ndarray, counts: np.ndarray):
+        labels = self._assign(Xb, self.centroids)
+        diff = Xb - self.centroids[labels]
+        batch_inertia = float(np.einsum("ij,ij->", diff, diff)) / max(len(Xb), 1)
+        k = self.n_clusters
+        b_counts = np.bincount(labels, minlength=k)
+        sums = np.zeros((k, Xb.shape[1]), dtype=np.float64)
+        np.add.at(sums, labels, Xb)
+        old = self.centroids.astype(np.float64)
+        counts += b_counts
+        hit = b_counts > 0
+        new = old.copy()
+        new[hit] = old[hit] + (sums[hit] - b_counts[hit, None] * old[hit]) / counts[hit, None]
+        self.centroids = new.astype(Xb.dtype, copy=False)
+        return labels, _max_shift(new, old), batch_inertia
+
+    # catat statistik satu iterasi dan teruskan ke callback (bila ada)
+    def _record(self, history: List[Dict[str, Any]], run: int, n_iter: int,
+                moved: int | None, shift: float, t0: float):
+        stats = {"run": run, "iter": n_iter, "moved": moved, "shift": shift,
+                 "seconds": time.perf_counter() - t0}
+        history.append(stats)
+        if self.callback is not None:
+            self.callback(stats)
+
+    # fit mini-batch dari satu seed: batch acak berukuran tetap.
+    # Pergeseran per batch terlalu berisik untuk dibandingkan langsung dengan tol, jadi
+    # (seperti MiniBatchKMeans) dipakai rata-rata bergerak eksponensial (EWA) atas batch:
+    # berhenti bila EWA pergeseran <= tol, atau EWA inertia tidak membaik
+    # max_no_improvement batch berturut-turut
+    def _single_fit_minibatch(self, X: np.ndarray, seed: int, run: int = 0):
+        rng = np.random.default_rng(seed)
+        n = X.shape[0]
+        init_size = min(n, max(3 * self.batch_size, self.n_clusters))
+        sample = X[np.sort(rng.choice(n, init_size, replace=False))] if init_size < n else X
+        self.centroids = self._init_centroids(sample, seed)
+        counts = np.zeros(self.n_clusters, dtype=np.int64)
+        history: List[Dict[str, Any]] = []
+        reason = "max_iters"
+        n_iter = 0
+        b = min(self.batch_size, n)
+        alpha = min(1.0, 2.0 * b / (n + 1))  # bobot batch baru, setara jendela ~n/b batch
+        ewa_shift = ewa_inertia = None
+        best_inertia, no_improvement = np.inf, 0
+        for n_iter in range(1, self.max_iters + 1):
+            t0 = time.perf_counter()
+            batch = X[rng.integers(0, n, b)]
+            _, shift, batch_inertia = self._minibatch_step(batch, counts)
+            self._record(history, run, n_iter, None, shift, t0)
+            if n_iter == 1:
+                continue  # batch pertama mengisi centroid awal; lompatannya bukan sinyal konvergensi
+            if ewa_shift is None:
+                ewa_shift, ewa_inertia = shift, batch_inertia
+            else:
+                ewa_shift += alpha * (shift - ewa_shift)
+                ewa_inertia += alpha * (batch_inertia - ewa_inertia)
+            history[-1]["ewa_shift"] = ewa_shift
+            if ewa_shift <= self.tol:
+                reason = "tol"
+                break
+            if ewa_inertia < best_inertia:
+                best_inertia, no_improvement = ewa_inertia, 0
+            else:
+                no_improvement += 1
+                if no_improvement >= self.max_no_improvement:
+                    reason = "no_improvement"
+                    break
+        self.labels = self._assign(X, self.centroids)
+        inertia = self._wcss(X, self.labels, self.centroids)
+        return self.centroids, self.labels, inertia, n_iter, history, reason
+
+    # satu kali fit (Lloyd) dari satu seed
+    # -> (centroids, labels, inertia, n_iter, history, stop_reason)
+    def _single_fit(self, X: np.ndarray, seed: int, run: int = 0):
+        if self.batch_size:
+            return self._single_fit_minibatch(X, seed, run)
+        self.centroids = self._init_centroids(X, seed)
+        self.labels = None
+        last_labels: np.ndarray | None = None
+        if self.algorithm == "hamerly":
+            assign = _HamerlyAssigner(X)
+        else:
+            assign = lambda cents: self._assign(X, cents)
+        history: List[Dict[str, Any]] = []
+        reason = "max_iters"
+        n_iter = 0
+        for n_iter in range(1, self.max_iters + 1):
+            t0 = time.perf_counter()
+            labels = assign(self.centroids)
+            new_cents = self._update(X, labels)
+            shift = _max_shift(new_cents, self.centroids)
+            moved = int(labels.size if last_labels is None else np.count_nonzero(labels != last_labels))
+            if np.array_equal(new_cents, self.centroids) and last_labels is not None and moved == 0:
                 self.labels = labels
+                self._record(history, run, n_iter, moved, shift, t0)
+                reason = "converged"
                 break
             self.centroids = new_cents
             self.labels = labels
             last_labels = labels
+            if shift <= self.tol:
+                # label disesuaikan dengan centroid terakhir agar pasangan hasilnya konsisten
+                self.labels = assign(self.centroids)
+                self._record(history, run, n_iter, moved, shift, t0)
+                reason = "tol"
+                break
+            self._record(history, run, n_iter, moved, shift, t0)
+        inertia = self._wcss(X, self.labels, self.centroids)
+        return self.centroids, self.labels, inertia, n_iter, history, reason
+
+    # API publik
+    def fit(self, data: Any):
+        X = self._as_array(data)
+        seeds = self._restart_seeds()
+        parallel = _is_parallel(self.n_jobs, len(seeds))
+        # callback tidak dikirim ke worker; pada mode paralel statistik diputar ulang setelahnya
+        params = {**self._params(), "callback": None if parallel else self.callback}
+        runs = _parallel_map(_kmeans_restart, [(params, X, s, i) for i, s in enumerate(seeds)], self.n_jobs)
+        if parallel and self.callback is not None:
+            for run in runs:
+                for stats in run[4]:
+                    self.callback(stats)
+        # restart dengan WCSS terendah; seri -> restart paling awal (deterministik)
+        best = min(range(len(runs)), key=lambda i: (runs[i][2], i))
+        self.centroids, self.labels, self.inertia_, self.n_iter_, self.history_, self.stop_reason_ = runs[best]
+        self.iter_times_ = [h["seconds"] for h in self.history_]
+        self.converged_ = self.stop_reason_ != "max_iters"
+        self._counts = None
+        return self
+
+    # update inkremental dari satu batch (mis. potongan data yang dibaca bertahap)
+    def partial_fit(self, data: Any):
+        X = self._as_array(data)
+        if self.centroids is None:
+            if X.shape[0] < self.n_clusters:
+                raise ValueError("Batch pertama harus berisi minimal n_clusters baris.")
+            self.centroids = self._init_centroids(X, self.random_state)
+            self._counts = np.zeros(self.n_clusters, dtype=np.int64)
+            self.n_iter_ = 0
+            self.history_, self.iter_times_ = [], []
+        elif self._counts is None:
+            if self.labels is not None:
+                # lanjut dari model hasil fit(): anggap tiap centroid sudah "melihat" clusternya
+                self._counts = np.bincount(self.labels, minlength=self.n_clusters).astype(np.int64)
+            else:
+                # model dari from_state tanpa counts: centroid dihitung sebagai satu titik,
+                # sehingga batch pertama menggeser tapi tidak menimpa centroid tersimpan
+                self._counts = np.ones(self.n_clusters, dtype=np.int64)
+        t0 = time.perf_counter()
+        self.labels, shift, _ = self._minibatch_step(X, self._counts)
+        self.n_iter_ = (self.n_iter_ or 0) + 1
+        self._record(self.history_, 0, self.n_iter_, None, shift, t0)
+        self.iter_times_.append(self.history_[-1]["seconds"])
+        self.converged_ = shift <= self.tol
         return self
 
-    def predict(self, data: Sequence[Sequence[float]]) -> List[int]:
+    def predict(self, data: Any) -> np.ndarray:
         if self.centroids is None:
             raise ValueError("Model belum di-fit.")
-        return self._assign(data, self.centroids)
+        X = np.ascontiguousarray(data, dtype=self.centroids.dtype)
+        return self._assign(X, self.centroids)
 
-    def fit_predict(self, data: Sequence[Sequence[float]]) -> List[int]:
+    def fit_predict(self, data: Any) -> np.ndarray:
         self.fit(data)
         return self.labels
 
+    # centroid + parameter dalam bentuk list (bisa disimpan sebagai JSON) dan sebaliknya;
+    # model hasil from_state siap dipakai untuk predict/partial_fit tanpa data asli
+    def get_state(self) -> Dict[str, Any]:
+        if self.centroids is None:
+            raise ValueError("Model belum di-fit.")
+        if self._counts is not None:
+            counts = self._counts
+        elif self.labels is not None:
+            counts = np.bincount(self.labels, minlength=self.n_clusters)
+        else:
+            counts = None
+        params = {**self._params(), "dtype": self.dtype.name}
+        return {
+            "params": params,
+            "centroids": np.asarray(self.centroids, dtype=np.float64).tolist(),
+            "counts": counts.tolist() if counts is not None else None,
+            "inertia": self.inertia_,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "KMeansCustom":
+        model = cls(**state["params"])
+        model.centroids = np.asarray(state["centroids"], dtype=model.dtype)
+        model.n_clusters = model.centroids.shape[0]
+        if state.get("counts") is not None:
+            model._counts = np.asarray(state["counts"], dtype=np.int64)
+        model.inertia_ = state.get("inertia")
+        return model
+
+# Sweep k: satu fit per k, dipakai bersama untuk Elbow, DBI, dan hasil akhir
+def _sweep_one(args: Tuple[Dict[str, Any], np.ndarray, int]) -> Dict[str, Any]:
+    params, X, k = args
+    model = KMeansCustom(**{**params, "n_clusters": k})
+    model.fit(X)
+    return {
+        "k": k,
+        "wcss": model.inertia_,
+        "dbi": compute_dbi(X, model.labels, model.centroids, k) if k >= 2 else None,
+        "labels": model.labels,
+        "centroids": model.centroids,
+        "n_iter": model.n_iter_,
+        "stop_reason": model.stop_reason_,
+        "seconds": float(sum(model.iter_times_)),
+    }
+
+def sweep_k(
+    data: Any,
+    k_values: Sequence[int] = range(1, 11),
+    n_jobs: int | None = None,
+    **kmeans_params: Any,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Fit KMeansCustom sekali untuk tiap k.
+    Kembalikan {k: {wcss, dbi, labels, centroids, n_iter, stop_reason, seconds}}.
+    n_jobs > 1 (atau -1) menjalankan tiap k paralel di process pool bersama (lihat MAX_WORKERS;
+    restart n_init di dalamnya berurutan).
+    """
+    params = {k: v for k, v in kmeans_params.items() if k != "n_clusters"}
+    if n_jobs is not None and n_jobs != 1:
+        params["n_jobs"] = None
+    X = KMeansCustom(**params)._as_array(data)
+    runs = _parallel_map(_sweep_one, [(params, X, int(k)) for k in k_values], n_jobs)
+    return {r["k"]: r for r in runs}
+
+def elbow_k(k_values: Sequence[int], wcss_values: Sequence[float]) -> int:
+    """
+    Rekomendasi k dari kurvatur terbesar kurva WCSS (k berurutan).
+    """
+    best_k = 3
+    best_curve = float("-inf")
+    for i in range(2, len(wcss_values)):
+        d1 = wcss_values[i - 2] - wcss_values[i - 1]
+        d2 = wcss_values[i - 1] - wcss_values[i]
+        curvature = d1 - d2
+        if curvature > best_curve:
+            best_curve = curvature
+            best_k = k_values[i - 1]
+    return best_k
+
 # Davies–Bouldin Index 
 def compute_dbi(
-    data: Sequence[Sequence[float]],
-    labels: Sequence[int],
-    centroids: Sequence[Sequence[float]],
+    data: Any,
+    labels: Any,
+    centroids: Any,
     n_clusters: int,
 ) -> float:
-    # S_i: rata-rata jarak ke centroid dalam cluster i
-    S: List[float] = []
-    for i in range(n_clusters):
-        pts = [data[j] for j in range(len(data)) if labels[j] == i]
-        if not pts:
-            S.append(0.0)
-            continue
-        dsum = 0.0
-        for p in pts:
-            s = 0.0
-            for a, b in zip(p, centroids[i]):
-                diff = a - b
-                s += diff * diff
-            dsum += s ** 0.5
-        S.append(dsum / len(pts))
-
-    # M_ij: jarak antar centroid
-    M = [[0.0 for _ in range(n_clusters)] for _ in range(n_clusters)]
-    for i in range(n_clusters):
-        for j in range(n_clusters):
-            if i == j: 
-                continue
-            s = 0.0
-            for a, b in zip(centroids[i], centroids[j]):
-                diff = a - b
-                s += diff * diff
-            M[i][j] = s ** 0.5
-
-    # R_ij
-    R = [[0.0 for _ in range(n_clusters)] for _ in range(n_clusters)]
-    for i in range(n_clusters):
-        for j in range(n_clusters):
-            if i != j and M[i][j] != 0:
-                R[i][j] = (S[i] + S[j]) / M[i][j]
+    if n_clusters <= 0:
+        return float("inf")
+    X = np.asarray(data, dtype=np.float64)
+    lab = np.asarray(labels, dtype=np.intp)
+    C = np.asarray(centroids, dtype=np.float64)[:n_clusters]
+
+    # S_i: rata-rata jarak ke centroid dalam cluster i (dari jumlah scatter per cluster)
+    diff = X - C[lab]
+    dist = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+    counts = np.bincount(lab, minlength=n_clusters)[:n_clusters]
+    scatter = np.bincount(lab, weights=dist, minlength=n_clusters)[:n_clusters]
+    S = np.where(counts > 0, scatter / np.maximum(counts, 1), 0.0)
+
+    # M_ij: matriks jarak antar centroid (k x k)
+    M = np.sqrt(_sq_dists(C, C))
+
+    # R_ij (0 untuk diagonal / centroid berimpit)
+    valid = M != 0
+    np.fill_diagonal(valid, False)
+    R = np.zeros_like(M)
+    np.divide(S[:, None] + S[None, :], M, out=R, where=valid)
 
     # DBI = rata-rata max R_i
-    max_R = [max(R[i]) if any(R[i]) else 0.0 for i in range(n_clusters)]
-    return (sum(max_R) / len(max_R)) if max_R else float("inf")
+    return float(R.max(axis=1).mean())
 
 # Urutan cluster & Label Deskriptif 
-def compute_cluster_means(df, selected_features: List[str], cluster_col: str) -> List[int]:
+def cluster_order(values: Any, cluster_ids: Any) -> List[Any]:
     """
-    Hitung rata-rata per cluster berdasarkan selected_features (tanpa numpy).
+    Rata-rata per cluster (NaN diabaikan) tiap fitur, dirata-ratakan antar fitur.
     Kembalikan urutan cluster_id dari total-mean terendah ke tertinggi.
     """
-    cluster_sums: Dict[str, Dict[Any, float]] = {f: {} for f in selected_features}
-    cluster_counts: Dict[str, Dict[Any, int]] = {f: {} for f in selected_features}
-
-    for _, row in df.iterrows():
-        cid = row[cluster_col]
-        for f in selected_features:
-            v = row[f]
-            if v is None or (isinstance(v, float) and v != v):  # NaN
-                continue
-            cluster_sums[f][cid] = cluster_sums[f].get(cid, 0.0) + float(v)
-            cluster_counts[f][cid] = cluster_counts[f].get(cid, 0) + 1
-
-    total_means: Dict[Any, float] = {}
-    all_cids = set()
-    for d in cluster_sums.values():
-        all_cids |= set(d.keys())
+    X = np.asarray(values, dtype=np.float64)
+    if X.ndim == 1:
+        X = X[:, None]
+    ids, inv = np.unique(np.asarray(cluster_ids), return_inverse=True)
+    inv = inv.ravel()
+    valid = ~np.isnan(X)
+    Xz = np.where(valid, X, 0.0)
+    sums = np.stack([np.bincount(inv, weights=Xz[:, j], minlength=ids.size) for j in range(X.shape[1])], axis=1)
+    counts = np.stack([np.bincount(inv, weights=valid[:, j], minlength=ids.size) for j in range(X.shape[1])], axis=1)
+    means = np.where(counts > 0, sums / np.maximum(counts, 1), 0.0)
+    total = means.mean(axis=1) if X.shape[1] else np.zeros(ids.size)
 
-    for cid in all_cids:
-        means = []
-        for f in selected_features:
-            s = cluster_sums[f].get(cid, 0.0)
-            c = cluster_counts[f].get(cid, 0)
-            means.append((s / c) if c > 0 else 0.0)
-        total_means[cid] = sum(means) / (len(means) if means else 1)
+    seen = counts.sum(axis=1) > 0  # cluster tanpa nilai valid sama sekali diabaikan
+    order = np.argsort(total[seen], kind="stable")
+    return ids[seen][order].tolist()
 
-    return sorted(total_means.keys(), key=lambda k: total_means[k])
+def compute_cluster_means(df, selected_features: List[str], cluster_col: str) -> List[int]:
+    """
+    Hitung rata-rata per cluster berdasarkan selected_features.
+    Kembalikan urutan cluster_id dari total-mean terendah ke tertinggi.
+    """
+    values = df[selected_features].to_numpy(dtype=np.float64, na_value=np.nan)
+    return cluster_order(values, df[cluster_col].to_numpy())
 
 def get_cluster_labels(n_clusters: int, sorted_clusters: List[int]) -> Dict[int, str]:
     """
@@ -287,5 +762,5 @@ def apply_descriptive_labels(df, selected_features: List[str], cluster_col: str,
     order = compute_cluster_means(df, selected_features, cluster_col)
     labels_map = get_cluster_labels(n_clusters, order)
     df_out = df.copy()
-    df_out['Keterangan'] = [labels_map[c] for c in df_out[cluster_col]]
+    df_out['Keterangan'] = df_out[cluster_col].map(labels_map)
     return df_out, labels_map
\ No newline at end of file
@@ -1,5 +1,7 @@
 import pandas as pd
 
+CHUNK_ROWS = 50_000
+
 def read_file(uploaded_file):
     if uploaded_file.name.endswith('.csv'):
         return pd.read_csv(uploaded_file)
@@ -7,3 +9,44 @@ def read_file(uploaded_file):
         return pd.read_excel(uploaded_file)
     else:
         raise ValueError("Format file tidak didukung.")
+
+def _iter_xlsx_chunks(uploaded_file, chunksize: int):
+    # mode read_only openpyxl membaca baris secara streaming
+    from openpyxl import load_workbook
+    wb = load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+        batch = []
+        for row in rows:
+            if row is None or all(v is None for v in row):
+                continue
+            batch.append(row)
+            if len(batch) >= chunksize:
+                yield pd.DataFrame.from_records(batch, columns=columns)
+                batch = []
+        if batch:
+            yield pd.DataFrame.from_records(batch, columns=columns)
+    finally:
+        wb.close()
+
+def iter_file_chunks(uploaded_file, chunksize: int = CHUNK_ROWS):
+    """
+    Baca CSV/Excel per potongan (DataFrame berisi maksimal chunksize baris).
+    File selalu dibaca dari awal sehingga bisa dipanggil berulang (mis. dua pass).
+    """
+    uploaded_file.seek(0)
+    if uploaded_file.name.endswith('.csv'):
+        yield from pd.read_csv(uploaded_file, chunksize=chunksize)
+    elif uploaded_file.name.endswith('.xlsx'):
+        yield from _iter_xlsx_chunks(uploaded_file, chunksize)
+    elif uploaded_file.name.endswith('.xls'):
+        # format .xls lama tidak mendukung streaming
+        df = pd.read_excel(uploaded_file)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+    else:
+        raise ValueError("Format file tidak didukung.")
@@ -0,0 +1,236 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+__all__ = [
+    "LRUCache",
+    "make_sweep_key",
+    "get_cluster_cache",
+    "get_map_cache",
+]
+
+CACHE_DIR = os.getenv("CLUSTER_CACHE_DIR")  # kosong = cache hanya di memori
+CACHE_MAX_ENTRIES = int(os.getenv("CLUSTER_CACHE_MAX_ENTRIES", "32"))
+CACHE_MAX_MB = int(os.getenv("CLUSTER_CACHE_MAX_MB", "256"))
+CACHE_DISK_MAX_MB = int(os.getenv("CLUSTER_CACHE_DISK_MAX_MB", "1024"))
+# hasil render halaman peta (HTML peta, spesifikasi grafik); hanya di memori
+MAP_CACHE_MAX_ENTRIES = int(os.getenv("CLUSTER_MAP_CACHE_MAX_ENTRIES", "32"))
+MAP_CACHE_MAX_MB = int(os.getenv("CLUSTER_MAP_CACHE_MAX_MB", "128"))
+
+# perkiraan ukuran objek (array numpy dihitung dari nbytes)
+def _sizeof(obj: Any) -> int:
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, dict):
+        return 64 + sum(_sizeof(k) + _sizeof(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return 64 + sum(_sizeof(v) for v in obj)
+    if isinstance(obj, (str, bytes)):
+        return 49 + len(obj)
+    return 32
+
+class LRUCache:
+    """
+    Cache LRU thread-safe dengan batas jumlah entri dan byte di memori.
+    Bila disk_dir diisi, entri juga ditulis sebagai pickle (dibatasi disk_max_bytes)
+    sehingga bertahan antar-restart proses.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 32,
+        max_bytes: int = 256 * 1024 * 1024,
+        disk_dir: str | None = None,
+        disk_max_bytes: int = 1024 * 1024 * 1024,
+    ):
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes)
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = int(disk_max_bytes)
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._data or (self._disk_path(key) is not None and os.path.exists(self._disk_path(key)))
+
+    def _disk_path(self, key: str) -> str | None:
+        return os.path.join(self.disk_dir, f"{key}.pkl") if self.disk_dir else None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+        value = self._load_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._put_memory(key, value)
+            return value
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._put_memory(key, value)
+        self._save_disk(key, value)
+
+    def invalidate(self, key: str | None = None, predicate: Callable[[str], bool] | None = None):
+        """Hapus satu key, atau semua key yang memenuhi predicate (tanpa argumen = kosongkan)."""
+        with self._lock:
+            if key is not None:
+                keys = [key]
+            elif predicate is not None:
+                keys = [k for k in self._data if predicate(k)]
+                if self.disk_dir:
+                    keys += [f[:-4] for f in os.listdir(self.disk_dir)
+                             if f.endswith(".pkl") and predicate(f[:-4])]
+            else:
+                keys = list(self._data)
+                if self.disk_dir:
+                    keys += [f[:-4] for f in os.listdir(self.disk_dir) if f.endswith(".pkl")]
+            for k in set(keys):
+                if k in self._data:
+                    del self._data[k]
+                    self._bytes -= self._sizes.pop(k, 0)
+                path = self._disk_path(k)
+                if path and os.path.exists(path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def clear(self):
+        self.invalidate()
+
+    def _put_memory(self, key: str, value: Any):
+        size = _sizeof(value)
+        if key in self._data:
+            self._bytes -= self._sizes.pop(key, 0)
+            del self._data[key]
+        if size > self.max_bytes:
+            return  # terlalu besar untuk memori; hanya disimpan di disk (bila aktif)
+        self._data[key] = value
+        self._sizes[key] = size
+        self._bytes += size
+        while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+            old_key, _ = self._data.popitem(last=False)
+            self._bytes -= self._sizes.pop(old_key, 0)
+
+    def _load_disk(self, key: str) -> Any:
+        path = self._disk_path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)  # tandai baru dipakai untuk eviksi LRU di disk
+            return value
+        except Exception:
+            return None
+
+    def _save_disk(self, key: str, value: Any):
+        path = self._disk_path(key)
+        if not path:
+            return
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".pkl"):
+                continue
+            full = os.path.join(self.disk_dir, name)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, full))
+        total = sum(e[1] for e in entries)
+        for _, size, full in sorted(entries):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(full)
+                total -= size
+            except OSError:
+                pass
+
+def make_sweep_key(
+    df: pd.DataFrame,
+    features: Sequence[str],
+    k_values: Sequence[int],
+    params: Dict[str, Any],
+    prefix: str = "",
+) -> str:
+    """
+    Key cache hasil sweep: hash isi kolom fitur + daftar fitur + rentang k + parameter
+    KMeans (termasuk seed). prefix (mis. nama tabel) memudahkan invalidasi per dataset.
+    """
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(df[list(features)], index=False).to_numpy().tobytes())
+    h.update(json.dumps(
+        {"features": list(features), "k": [int(k) for k in k_values], "params": params},
+        sort_keys=True, default=str,
+    ).encode("utf-8"))
+    digest = h.hexdigest()[:40]
+    return f"{prefix}__{digest}" if prefix else digest
+
+_cluster_cache: LRUCache | None = None
+_cluster_cache_lock = threading.Lock()
+
+def get_cluster_cache() -> LRUCache:
+    """Cache hasil clustering bersama untuk satu proses (dikonfigurasi lewat env)."""
+    global _cluster_cache
+    with _cluster_cache_lock:
+        if _cluster_cache is None:
+            _cluster_cache = LRUCache(
+                max_entries=CACHE_MAX_ENTRIES,
+                max_bytes=CACHE_MAX_MB * 1024 * 1024,
+                disk_dir=CACHE_DIR,
+                disk_max_bytes=CACHE_DISK_MAX_MB * 1024 * 1024,
+            )
+        return _cluster_cache
+
+_map_cache: LRUCache | None = None
+
+def get_map_cache() -> LRUCache:
+    """
+    Cache render peta bersama untuk satu proses. Key diawali "<tabel_clustered>@<versi>"
+    sehingga seluruh entri satu tabel bisa dibuang dengan invalidate(predicate=...).
+    """
+    global _map_cache
+    with _cluster_cache_lock:
+        if _map_cache is None:
+            _map_cache = LRUCache(max_entries=MAP_CACHE_MAX_ENTRIES, max_bytes=MAP_CACHE_MAX_MB * 1024 * 1024)
+        return _map_cache
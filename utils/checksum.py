@@ -0,0 +1,35 @@
+from __future__ import annotations
+import hashlib
+import json
+from typing import Dict, Iterable, Iterator
+
+import pandas as pd
+
+__all__ = ["ChunkDigest"]
+
+class ChunkDigest:
+    """
+    Checksum isi tabel yang dihitung sambil chunk lewat (tee), tanpa menyimpan data.
+    Hash mencakup tipe kolom dan isi baris sesuai urutan, jadi dua penulisan dengan
+    isi sama menghasilkan checksum sama (dipakai sebagai versi mirror dan di katalog).
+    """
+
+    def __init__(self, column_types: Dict[str, str]):
+        self._hash = hashlib.sha1(json.dumps(dict(column_types), sort_keys=True).encode())
+        self.rows = 0
+        self.nbytes = 0
+
+    def update(self, chunk: pd.DataFrame):
+        self._hash.update(pd.util.hash_pandas_object(chunk, index=False).to_numpy().tobytes())
+        self.rows += len(chunk)
+        self.nbytes += int(chunk.memory_usage(index=False, deep=True).sum())
+
+    def tee(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        for chunk in chunks:
+            if not chunk.empty:
+                self.update(chunk)
+            yield chunk
+
+    @property
+    def checksum(self) -> str:
+        return self._hash.hexdigest()[:16]
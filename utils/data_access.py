@@ -0,0 +1,143 @@
+from __future__ import annotations
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from utils.db_writer import table_generation
+from utils.mirror import mirror_schema, mirror_version, read_mirror
+from utils.retention import catalog_checksum
+
+__all__ = [
+    "mirror_current",
+    "table_columns",
+    "numeric_columns",
+    "read_columns",
+    "read_preview",
+    "table_version",
+]
+
+# tabel di atas ambang ini dibaca lewat server-side cursor per chunk
+STREAM_CHUNK_ROWS = 20_000
+
+_INT_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint"}
+_FLOAT_TYPES = {"float", "double", "decimal", "numeric", "real"}
+
+def table_version(table: str) -> str:
+    """
+    Versi isi tabel untuk kunci cache: nomor tulis bulk_write di proses ini + hash mirror
+    (berubah juga bila tabel ditulis ulang proses lain yang berbagi direktori mirror).
+    """
+    return f"{table_generation(table)}.{mirror_version(table) or 'db'}"
+
+def mirror_current(engine, table: str) -> bool:
+    """
+    Mirror lokal boleh dipakai hanya bila versinya (hash isi) sama dengan checksum di katalog.
+    File mirror bertahan antar proses; bila proses lain menulis ulang/menghapus tabel,
+    pembacaan kembali ke DB. File tidak dihapus di sini: sesaat setelah bulk_write katalog
+    bisa belum diperbarui, dan mirror basi diganti sendiri pada penulisan berikutnya.
+    Satu query katalog: halaman cukup memanggilnya sekali per tabel lalu meneruskan hasilnya
+    sebagai mirror_ok ke table_columns/read_preview/read_columns.
+    """
+    version = mirror_version(table)
+    return version is not None and catalog_checksum(engine, table) == version
+
+def _resolve_mirror(engine, table: str, mirror_ok: bool | None) -> bool:
+    return mirror_current(engine, table) if mirror_ok is None else mirror_ok
+
+def table_columns(engine, table: str, mirror_ok: bool | None = None) -> Dict[str, str]:
+    """
+    Nama kolom -> DATA_TYPE (urut sesuai posisi kolom).
+    Diambil dari footer mirror lokal bila ada (dan masih sesuai katalog), selain itu dari
+    information_schema. mirror_ok: hasil mirror_current (None = cek katalog di sini,
+    False = selalu DB).
+    """
+    if _resolve_mirror(engine, table, mirror_ok):
+        schema = mirror_schema(table)
+        if schema is not None:
+            return schema
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT COLUMN_NAME, DATA_TYPE FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = :t
+            ORDER BY ORDINAL_POSITION
+        """), {"t": table}).fetchall()
+    return {name: str(dtype).lower() for name, dtype in rows}
+
+def numeric_columns(schema: Dict[str, str]) -> List[str]:
+    return [c for c, t in schema.items() if t in _INT_TYPES or t in _FLOAT_TYPES]
+
+def _select_sql(table: str, columns: Sequence[str] | None, limit: int | None = None) -> str:
+    cols = ", ".join(f"`{c}`" for c in columns) if columns else "*"
+    sql = f"SELECT {cols} FROM `{table}`"
+    return f"{sql} LIMIT {int(limit)}" if limit is not None else sql
+
+def read_preview(engine, table: str, limit: int = 100, columns: Sequence[str] | None = None,
+                 mirror_ok: bool | None = None) -> pd.DataFrame:
+    """Beberapa baris pertama saja, untuk tampilan ringkas."""
+    df = read_mirror(table, columns, limit=limit) if _resolve_mirror(engine, table, mirror_ok) else None
+    if df is not None:
+        return df
+    with engine.connect() as conn:
+        return pd.read_sql(text(_select_sql(table, columns, limit)), conn)
+
+def _alloc(dtype: str | None, n: int) -> np.ndarray:
+    if dtype in _INT_TYPES:
+        return np.empty(n, dtype=np.int64)
+    if dtype in _FLOAT_TYPES:
+        return np.empty(n, dtype=np.float64)
+    return np.empty(n, dtype=object)
+
+def read_columns(
+    engine,
+    table: str,
+    columns: Sequence[str] | None = None,
+    schema: Dict[str, str] | None = None,
+    chunksize: int = STREAM_CHUNK_ROWS,
+    mirror_ok: bool | None = None,
+) -> pd.DataFrame:
+    """
+    SELECT hanya kolom yang diminta (None = semua kolom).
+    Bila tabel punya mirror Arrow lokal (utils.mirror) yang masih sesuai katalog (mirror_ok,
+    lihat table_columns), kolom dibaca dari sana lewat mmap.
+    Tabel kecil dibaca sekali jalan; tabel besar di-stream (stream_results) per chunk
+    langsung ke array numpy yang dialokasikan di awal berdasarkan COUNT(*).
+    """
+    mirror_ok = _resolve_mirror(engine, table, mirror_ok)
+    schema = schema if schema is not None else table_columns(engine, table, mirror_ok)
+    names = list(columns) if columns else list(schema)
+    missing = [c for c in names if c not in schema]
+    if missing:
+        raise KeyError(f"Kolom tidak ada di `{table}`: {', '.join(missing)}")
+
+    if mirror_ok:
+        df = read_mirror(table, names)
+        if df is not None:
+            return df
+
+    with engine.connect() as conn, conn.begin():
+        # COUNT dan SELECT dalam satu transaksi agar melihat tabel yang sama
+        n = int(conn.execute(text(f"SELECT COUNT(*) FROM `{table}`")).scalar() or 0)
+        if n <= chunksize:
+            return pd.read_sql(text(_select_sql(table, names)), conn)
+
+        arrays = [_alloc(schema.get(c), n) for c in names]
+        result = conn.execution_options(stream_results=True, max_row_buffer=chunksize) \
+                     .execute(text(_select_sql(table, names)))
+        pos = 0
+        for part in result.partitions(chunksize):
+            m = len(part)
+            if pos + m > n:  # jaga-jaga bila jumlah baris bertambah
+                n = pos + m
+                arrays = [np.resize(a, n) for a in arrays]
+            for j, col_vals in enumerate(zip(*part)):
+                arr = arrays[j]
+                if arr.dtype.kind == "i" and any(v is None for v in col_vals):
+                    arr = arrays[j] = arr.astype(np.float64)  # NULL pada kolom integer -> NaN
+                if arr.dtype.kind == "f":
+                    arr[pos:pos + m] = np.array(col_vals, dtype=np.float64)
+                else:
+                    arr[pos:pos + m] = col_vals
+            pos += m
+    return pd.DataFrame({c: a[:pos] for c, a in zip(names, arrays)})
@@ -0,0 +1,342 @@
+from __future__ import annotations
+import os
+import tempfile
+import threading
+import uuid
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from utils.mirror import MirrorWriter, drop_mirror, mirror_enabled
+
+__all__ = [
+    "infer_column_types",
+    "bulk_write",
+    "table_generation",
+    "widen_columns",
+    "StagedAppend",
+]
+
+INSERT_CHUNK_ROWS = 5000
+LOAD_DATA_CHUNK_ROWS = 100_000
+VARCHAR_MAX = 1024
+
+# nomor tulis per tabel (per proses); naik tiap bulk_write selesai -> versi untuk cache turunan
+_generations: Dict[str, int] = {}
+_generations_lock = threading.Lock()
+
+def table_generation(table: str) -> int:
+    return _generations.get(table, 0)
+
+def _bump_generation(table: str):
+    with _generations_lock:
+        _generations[table] = _generations.get(table, 0) + 1
+
+# tmpfs bila tersedia, agar buffer LOAD DATA tetap di memori
+_TMP_DIR = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+
+def _varchar_len(n: int) -> int:
+    # bulatkan ke atas kelipatan 16 agar tidak terlalu ketat untuk baris berikutnya
+    return max(16, ((n + 15) // 16) * 16)
+
+def infer_column_types(df: pd.DataFrame, str_lengths: Dict[str, int] | None = None) -> Dict[str, str]:
+    """
+    Tentukan tipe kolom MySQL eksplisit dari dtype DataFrame.
+    str_lengths (opsional) = panjang string maksimum per kolom bila data dibaca per chunk.
+    """
+    types: Dict[str, str] = {}
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_bool_dtype(s):
+            types[col] = "TINYINT(1)"
+        elif pd.api.types.is_integer_dtype(s):
+            lo, hi = (int(s.min()), int(s.max())) if len(s) else (0, 0)
+            if -32768 <= lo and hi <= 32767:
+                types[col] = "SMALLINT"
+            elif -2**31 <= lo and hi < 2**31:
+                types[col] = "INT"
+            else:
+                types[col] = "BIGINT"
+        elif pd.api.types.is_float_dtype(s):
+            types[col] = "FLOAT" if s.dtype == np.float32 else "DOUBLE"
+        elif pd.api.types.is_datetime64_any_dtype(s):
+            types[col] = "DATETIME"
+        else:
+            if str_lengths and col in str_lengths:
+                n = str_lengths[col]
+            else:
+                n = int(s.dropna().astype(str).str.len().max()) if s.notna().any() else 0
+            types[col] = f"VARCHAR({_varchar_len(n)})" if n <= VARCHAR_MAX else "MEDIUMTEXT"
+    return types
+
+def _create_table(conn, table: str, column_types: Dict[str, str]):
+    cols = ",\n  ".join(f"`{c}` {t} NULL" for c, t in column_types.items())
+    conn.execute(text(f"DROP TABLE IF EXISTS `{table}`"))
+    conn.execute(text(f"CREATE TABLE `{table}` (\n  {cols}\n) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"))
+
+# format teks default LOAD DATA: tab-separated, escape '\', NULL = \N
+def _to_load_data_bytes(df: pd.DataFrame) -> bytes:
+    cols: List[pd.Series] = []
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_bool_dtype(s):
+            t = s.map({True: "1", False: "0"})
+        elif pd.api.types.is_datetime64_any_dtype(s):
+            t = s.dt.strftime("%Y-%m-%d %H:%M:%S")
+        elif pd.api.types.is_numeric_dtype(s):
+            t = s.astype(str)
+        else:
+            t = (s.astype(str)
+                  .str.replace("\\", "\\\\", regex=False)
+                  .str.replace("\t", "\\t", regex=False)
+                  .str.replace("\n", "\\n", regex=False)
+                  .str.replace("\r", "\\r", regex=False))
+        cols.append(t.where(s.notna(), "\\N"))
+    lines = cols[0].str.cat(cols[1:], sep="\t") if len(cols) > 1 else cols[0]
+    return ("\n".join(lines.tolist()) + "\n").encode("utf-8")
+
+def _load_data_supported(engine) -> bool:
+    """LOAD DATA LOCAL hanya dipakai bila server dan driver mengizinkan."""
+    if engine.dialect.name != "mysql" or engine.dialect.driver != "pymysql":
+        return False
+    try:
+        with engine.connect() as conn:
+            val = conn.exec_driver_sql("SELECT @@GLOBAL.local_infile").scalar()
+            return str(val).lower() in ("1", "on") and bool(getattr(conn.connection.dbapi_connection, "_local_infile", False))
+    except Exception:
+        return False
+
+def _write_load_data(engine, table: str, df: pd.DataFrame):
+    cols = ", ".join(f"`{c}`" for c in df.columns)
+    for start in range(0, len(df), LOAD_DATA_CHUNK_ROWS):
+        payload = _to_load_data_bytes(df.iloc[start:start + LOAD_DATA_CHUNK_ROWS])
+        # PyMySQL membaca LOCAL INFILE dari path, jadi buffer dititipkan ke file tmpfs sesaat
+        fd, path = tempfile.mkstemp(suffix=".tsv", dir=_TMP_DIR)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            with engine.begin() as conn:
+                conn.exec_driver_sql(
+                    f"LOAD DATA LOCAL INFILE '{path}' INTO TABLE `{table}` "
+                    f"CHARACTER SET utf8mb4 ({cols})"
+                )
+        finally:
+            os.remove(path)
+
+def _write_inserts(engine, table: str, df: pd.DataFrame):
+    cols = ", ".join(f"`{c}`" for c in df.columns)
+    placeholders = ", ".join(["%s"] * len(df.columns))
+    sql = f"INSERT INTO `{table}` ({cols}) VALUES ({placeholders})"
+    for start in range(0, len(df), INSERT_CHUNK_ROWS):
+        chunk = df.iloc[start:start + INSERT_CHUNK_ROWS]
+        rows = list(chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None))
+        # executemany PyMySQL menggabungkan baris menjadi INSERT multi-row
+        with engine.begin() as conn:
+            conn.exec_driver_sql(sql, rows)
+
+def _write_chunks(engine, table: str, chunks: Iterable[pd.DataFrame], use_load_data: bool) -> int:
+    total = 0
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        if use_load_data:
+            _write_load_data(engine, table, chunk)
+        else:
+            _write_inserts(engine, table, chunk)
+        total += len(chunk)
+    return total
+
+def bulk_write(
+    engine,
+    table_name: str,
+    data: pd.DataFrame | Iterable[pd.DataFrame],
+    column_types: Dict[str, str] | None = None,
+    if_exists: str = "replace",
+    use_load_data: bool = True,
+    mirror: bool = True,
+) -> int:
+    """
+    Tulis DataFrame (atau iterable chunk DataFrame) ke MySQL secara bulk.
+
+    - if_exists="replace": data dimuat ke tabel staging (commit per chunk), lalu ditukar
+      dengan RENAME TABLE yang atomik sehingga pembaca tidak pernah melihat tabel setengah jadi.
+    - if_exists="append": baris ditambahkan langsung ke tabel yang ada.
+    - LOAD DATA LOCAL INFILE dipakai bila server mengizinkan; selain itu INSERT multi-row per chunk.
+    - column_types wajib bila data berupa iterable chunk (lihat infer_column_types).
+    - mirror=True: pada mode replace, salinan Arrow lokal (utils.mirror) ikut ditulis dari
+      chunk yang sama dan diterbitkan setelah RENAME berhasil; mode append membuangnya.
+    Return: jumlah baris yang ditulis.
+    """
+    if if_exists not in ("replace", "append"):
+        raise ValueError("if_exists harus 'replace' atau 'append'.")
+    chunks = [data] if isinstance(data, pd.DataFrame) else data
+    if column_types is None:
+        if not isinstance(data, pd.DataFrame):
+            raise ValueError("column_types wajib diisi untuk data per chunk.")
+        column_types = infer_column_types(data)
+    use_load_data = use_load_data and _load_data_supported(engine)
+
+    if if_exists == "append":
+        # file Arrow tidak bisa ditambah baris; mirror lama dibuang, pembaca kembali ke DB
+        drop_mirror(table_name)
+        if not inspect(engine).has_table(table_name):
+            with engine.begin() as conn:
+                _create_table(conn, table_name, column_types)
+        try:
+            return _write_chunks(engine, table_name, chunks, use_load_data)
+        finally:
+            _bump_generation(table_name)  # sebagian chunk mungkin sudah ter-commit
+
+    writer = MirrorWriter(table_name, column_types) if mirror and mirror_enabled() else None
+    if writer is not None:
+        chunks = writer.tee(chunks)
+
+    # nama tabel MySQL maksimal 64 karakter
+    suffix = uuid.uuid4().hex[:8]
+    staging = f"{table_name[:48]}__stg_{suffix}"
+    old = f"{table_name[:48]}__old_{suffix}"
+    with engine.begin() as conn:
+        _create_table(conn, staging, column_types)
+    try:
+        total = _write_chunks(engine, staging, chunks, use_load_data)
+        with engine.begin() as conn:
+            if inspect(conn).has_table(table_name):
+                conn.execute(text(f"RENAME TABLE `{table_name}` TO `{old}`, `{staging}` TO `{table_name}`"))
+                conn.execute(text(f"DROP TABLE IF EXISTS `{old}`"))
+            else:
+                conn.execute(text(f"RENAME TABLE `{staging}` TO `{table_name}`"))
+    except Exception:
+        if writer is not None:
+            writer.abort()
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS `{staging}`"))
+        raise
+    if writer is not None:
+        writer.commit()
+    else:
+        drop_mirror(table_name)
+    _bump_generation(table_name)
+    return total
+
+_INT_RANK = {"tinyint": 0, "smallint": 1, "mediumint": 2, "int": 3, "integer": 3, "bigint": 4}
+_TEXT_TYPES = {"text", "mediumtext", "longtext"}
+# lebar minimum VARCHAR saat kolom numerik/tanggal berubah menjadi teks
+_NUM_AS_TEXT_LEN = 32
+
+def _parse_type(sql_type: str):
+    t = sql_type.strip().lower()
+    base = t.split("(", 1)[0].split(" ", 1)[0]
+    size = int(t.split("(", 1)[1].split(")", 1)[0].split(",", 1)[0]) if "(" in t else None
+    return base, size
+
+def _text_type(n: int) -> str:
+    return f"VARCHAR({_varchar_len(n)})" if n <= VARCHAR_MAX else "MEDIUMTEXT"
+
+def _wider_type(current: str, new: str) -> str | None:
+    """Tipe yang menampung isi kolom lama dan data baru; None bila current sudah cukup."""
+    cur, cur_n = _parse_type(current)
+    nxt, nxt_n = _parse_type(new)
+    if cur in _TEXT_TYPES:
+        return None
+    if cur == "varchar":
+        need = nxt_n if nxt == "varchar" else (VARCHAR_MAX + 1 if nxt in _TEXT_TYPES else _NUM_AS_TEXT_LEN)
+        return _text_type(need) if need > (cur_n or 0) else None
+    if nxt == "varchar" or nxt in _TEXT_TYPES:
+        return _text_type(max(nxt_n or VARCHAR_MAX + 1, _NUM_AS_TEXT_LEN))
+    if cur in _INT_RANK:
+        if nxt in _INT_RANK:
+            return new if _INT_RANK[nxt] > _INT_RANK[cur] else None
+        return "DOUBLE" if nxt in ("float", "double") else None
+    if cur == "float" and (nxt == "double" or nxt in _INT_RANK):
+        return "DOUBLE"
+    return None
+
+def widen_columns(engine, table: str, column_types: Dict[str, str]) -> Dict[str, str]:
+    """
+    Perlebar kolom `table` (satu ALTER) agar data bertipe column_types muat tanpa terpotong,
+    mis. VARCHAR(16) -> VARCHAR(48) atau SMALLINT -> INT; kolom yang belum ada ditambahkan.
+    Return: {kolom: tipe baru} yang diubah.
+    """
+    with engine.connect() as conn:
+        current = {name: str(ctype) for name, ctype in conn.execute(text("""
+            SELECT COLUMN_NAME, COLUMN_TYPE FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = :t
+        """), {"t": table})}
+    changes: Dict[str, str] = {}
+    clauses = []
+    for col, new in column_types.items():
+        if col not in current:
+            changes[col] = new
+            clauses.append(f"ADD COLUMN `{col}` {new} NULL")
+            continue
+        wider = _wider_type(current[col], new)
+        if wider:
+            changes[col] = wider
+            clauses.append(f"MODIFY COLUMN `{col}` {wider} NULL")
+    if clauses:
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE `{table}` " + ", ".join(clauses)))
+        drop_mirror(table)  # tipe kolom di footer mirror tidak lagi sesuai
+        _bump_generation(table)
+    return changes
+
+class StagedAppend:
+    """
+    Tambah baris ke beberapa tabel sebagai satu kesatuan:
+    kolom target diperlebar dulu (widen_columns), chunk ditulis ke tabel staging berstruktur
+    sama, lalu semua staging dipindahkan ke target dalam satu transaksi (INSERT ... SELECT).
+    Bila ada yang gagal, tidak ada target yang berubah isinya.
+
+        with StagedAppend(engine, {"data": types, "data_clustered": types2}) as stage:
+            stage.write("data", chunk)
+            stage.write("data_clustered", labeled)
+    """
+
+    def __init__(self, engine, column_types: Dict[str, Dict[str, str]], use_load_data: bool = True):
+        self.engine = engine
+        self.column_types = column_types
+        self.use_load_data = use_load_data and _load_data_supported(engine)
+        suffix = uuid.uuid4().hex[:8]
+        self._staging = {t: f"{t[:48]}__stg_{suffix}" for t in column_types}
+        self.rows = {t: 0 for t in column_types}
+
+    def __enter__(self) -> "StagedAppend":
+        try:
+            for table, types in self.column_types.items():
+                if not inspect(self.engine).has_table(table):
+                    with self.engine.begin() as conn:
+                        _create_table(conn, table, types)
+                else:
+                    widen_columns(self.engine, table, types)
+                with self.engine.begin() as conn:
+                    conn.execute(text(f"CREATE TABLE `{self._staging[table]}` LIKE `{table}`"))
+        except Exception:
+            self._drop_staging()
+            raise
+        return self
+
+    def write(self, table: str, df: pd.DataFrame):
+        self.rows[table] += _write_chunks(self.engine, self._staging[table], [df], self.use_load_data)
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._commit()
+        finally:
+            self._drop_staging()
+        return False
+
+    def _commit(self):
+        with self.engine.begin() as conn:
+            for table, types in self.column_types.items():
+                cols = ", ".join(f"`{c}`" for c in types)
+                conn.execute(text(f"INSERT INTO `{table}` ({cols}) SELECT {cols} FROM `{self._staging[table]}`"))
+        for table in self.column_types:
+            drop_mirror(table)  # file Arrow tidak bisa ditambah baris
+            _bump_generation(table)
+
+    def _drop_staging(self):
+        with self.engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS " + ", ".join(f"`{t}`" for t in self._staging.values())))
@@ -0,0 +1,217 @@
+from __future__ import annotations
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+__all__ = [
+    "NAME_KEYS",
+    "FUZZY_MIN_SCORE",
+    "get_name_from_props",
+    "normalize_name",
+    "GeoIndex",
+]
+
+# skor Dice trigram minimum agar nama dianggap cocok secara fuzzy
+FUZZY_MIN_SCORE = 0.75
+
+# kunci properti nama kecamatan yang dikenali (urut prioritas)
+NAME_KEYS = ("nm_kecamatan", "nama_kecamatan", "namakecam", "kecamatan",
+             "NAMA_KEC", "WADMKC", "Kec", "NAME_2", "name")
+
+def get_name_from_props(props: dict) -> str | None:
+    for k in NAME_KEYS:
+        v = props.get(k)
+        if isinstance(v, str) and v.strip():
+            return v.strip()
+    return None
+
+_PREFIX_RE = re.compile(r"^(kecamatan|kec)(\.|\s)+")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+def normalize_name(name: Any) -> str:
+    """
+    Kunci pencocokan nama: huruf kecil tanpa aksen, tanpa awalan "Kec."/"Kecamatan",
+    tanpa spasi & tanda baca ("Kec. Tapalang Barat" -> "tapalangbarat").
+    """
+    s = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode().lower().strip()
+    stripped = _PREFIX_RE.sub("", s)
+    return _NON_ALNUM_RE.sub("", stripped or s)
+
+def _trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# ring luar tiap poligon sebagai array (n, 2) lon/lat
+def _outer_rings(geometry: dict | None) -> List[np.ndarray]:
+    if not geometry:
+        return []
+    gtype = geometry.get("type")
+    coords = geometry.get("coordinates") or []
+    try:
+        if gtype == "Polygon":
+            polys = [coords]
+        elif gtype == "MultiPolygon":
+            polys = coords
+        elif gtype == "Point":
+            return [np.asarray([coords[:2]], dtype=np.float64)]
+        elif gtype in ("MultiPoint", "LineString"):
+            return [np.asarray([c[:2] for c in coords], dtype=np.float64)]
+        elif gtype == "MultiLineString":
+            return [np.asarray([c[:2] for c in line], dtype=np.float64) for line in coords]
+        else:
+            return []
+        return [np.asarray([c[:2] for c in poly[0]], dtype=np.float64) for poly in polys if poly and poly[0]]
+    except (TypeError, ValueError, IndexError):
+        return []
+
+# centroid luas (shoelace) dari ring luar; fallback rata-rata titik bila luas nol
+def _centroid(rings: Sequence[np.ndarray]) -> np.ndarray:
+    area_sum, cx, cy = 0.0, 0.0, 0.0
+    for r in rings:
+        if len(r) < 3:
+            continue
+        x, y = r[:, 0], r[:, 1]
+        x1, y1 = np.roll(x, -1), np.roll(y, -1)
+        cross = x * y1 - x1 * y
+        a = cross.sum() / 2.0
+        area_sum += a
+        cx += ((x + x1) * cross).sum() / 6.0
+        cy += ((y + y1) * cross).sum() / 6.0
+    if abs(area_sum) > 1e-15:
+        return np.array([cx / area_sum, cy / area_sum])
+    pts = np.concatenate(rings) if rings else np.full((1, 2), np.nan)
+    return pts.mean(axis=0)
+
+class GeoIndex:
+    """
+    Indeks GeoJSON yang dibangun sekali per file:
+    - nama ternormalisasi (normalize_name) -> id fitur (posisi di features)
+    - indeks trigram untuk pencocokan fuzzy nama yang ejaannya sedikit berbeda
+    - bbox (minx, miny, maxx, maxy) dan centroid (lon, lat) per fitur
+    Fitur disimpan by reference (tidak disalin). names/bboxes/centroids yang sudah dihitung
+    (mis. dari GeoStore) dapat diberikan agar geometri tidak perlu dibaca sama sekali.
+    """
+
+    def __init__(self, features: Sequence[dict], names: List[str | None] | None = None,
+                 bboxes: np.ndarray | None = None, centroids: np.ndarray | None = None):
+        self.features = features
+        n = len(features)
+        if names is None:
+            names = [get_name_from_props(feat.get("properties") or {}) for feat in features]
+        self.names: List[str | None] = list(names)
+        self.keys: Dict[str, int] = {}
+        for i, nm in enumerate(self.names):
+            if nm:
+                self.keys.setdefault(normalize_name(nm), i)
+        if bboxes is None or centroids is None:
+            bboxes = np.full((n, 4), np.nan)
+            centroids = np.full((n, 2), np.nan)
+            for i, feat in enumerate(features):
+                rings = _outer_rings(feat.get("geometry"))
+                if rings:
+                    pts = np.concatenate(rings)
+                    pts = pts[np.isfinite(pts).all(axis=1)]
+                    if len(pts):
+                        bboxes[i] = (*pts.min(axis=0), *pts.max(axis=0))
+                        centroids[i] = _centroid(rings)
+        self.bboxes = bboxes
+        self.centroids = centroids
+        self._grams: Dict[str, List[int]] = defaultdict(list)
+        self._gram_counts: Dict[int, int] = {}
+        for key, i in self.keys.items():
+            grams = _trigrams(key)
+            self._gram_counts[i] = len(grams)
+            for g in grams:
+                self._grams[g].append(i)
+        # hasil pencocokan per kunci (termasuk fuzzy) disimpan; nama unik di data sedikit
+        self._resolved: Dict[str, int | None] = {}
+
+    @classmethod
+    def from_geojson(cls, feature_collection: dict) -> "GeoIndex":
+        return cls(list(feature_collection.get("features", [])))
+
+    def __len__(self) -> int:
+        return len(self.features)
+
+    def _fuzzy(self, key: str) -> int | None:
+        grams = _trigrams(key)
+        overlap: Dict[int, int] = defaultdict(int)
+        for g in grams:
+            for i in self._grams.get(g, ()):
+                overlap[i] += 1
+        if not overlap:
+            return None
+        scored = sorted(((2.0 * c / (len(grams) + self._gram_counts[i]), i) for i, c in overlap.items()),
+                        reverse=True)
+        best_score, best = scored[0]
+        # ambigu (dua kandidat sama kuat) -> tidak dicocokkan
+        if best_score < FUZZY_MIN_SCORE or (len(scored) > 1 and scored[1][0] == best_score):
+            return None
+        return best
+
+    def lookup(self, name: Any) -> int | None:
+        """Id fitur untuk nama: cocok persis setelah normalisasi, lalu fuzzy trigram."""
+        key = normalize_name(name)
+        if key in self._resolved:
+            return self._resolved[key]
+        fid = self.keys.get(key)
+        if fid is None and key:
+            fid = self._fuzzy(key)
+        self._resolved[key] = fid
+        return fid
+
+    def match(self, names: pd.Series) -> Tuple[np.ndarray, Dict[str, str]]:
+        """
+        Id fitur per baris (-1 bila tidak ditemukan). Normalisasi & lookup hanya dilakukan
+        sekali per nama unik, lalu disebar ke semua baris secara vektor.
+        Return: (ids, {nama di data: nama GeoJSON} untuk pasangan yang cocok secara fuzzy).
+        """
+        codes, uniques = pd.factorize(names, use_na_sentinel=True)
+        ids_u = np.full(len(uniques) + 1, -1, dtype=np.int64)  # slot terakhir untuk NaN (code -1)
+        fuzzy: Dict[str, str] = {}
+        for j, raw in enumerate(uniques):
+            fid = self.lookup(raw)
+            if fid is None:
+                continue
+            ids_u[j] = fid
+            if normalize_name(raw) not in self.keys:
+                fuzzy[str(raw)] = self.names[fid] or ""
+        return ids_u[codes], fuzzy
+
+    def feature_collection(self, ids: np.ndarray, properties: pd.DataFrame,
+                           geometries: Sequence[dict | None] | None = None) -> dict:
+        """
+        FeatureCollection untuk fitur ids dengan properti dari baris properties (urutan sama).
+        geometries (opsional) menggantikan geometri asli, mis. hasil Topology.geometries_at.
+        Geometri dipakai by reference; properti dibuat sekali lewat to_dict("records").
+        """
+        records = properties.to_dict("records")
+        # geometri diambil per id saja; view lazy (GeoStore/Topology) hanya men-decode fitur ini
+        if geometries is None:
+            geom_of = lambda i: self.features[i].get("geometry")
+        else:
+            geom_of = geometries.__getitem__
+        return {
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "geometry": geom_of(i), "properties": rec}
+                for i, rec in zip(ids.tolist(), records)
+            ],
+        }
+
+    def bounds(self, ids: Iterable[int]) -> List[List[float]] | None:
+        """Bounds [[lat_min, lon_min], [lat_max, lon_max]] gabungan fitur ids (untuk fit_bounds)."""
+        ids = np.fromiter(ids, dtype=np.int64)
+        if ids.size == 0:
+            return None
+        boxes = self.bboxes[ids]
+        boxes = boxes[np.isfinite(boxes).all(axis=1)]
+        if boxes.size == 0:
+            return None
+        minx, miny = boxes[:, 0].min(), boxes[:, 1].min()
+        maxx, maxy = boxes[:, 2].max(), boxes[:, 3].max()
+        return [[float(miny), float(minx)], [float(maxy), float(maxx)]]
@@ -0,0 +1,307 @@
+from __future__ import annotations
+import json
+import os
+import sys
+import uuid
+from collections import abc
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+from utils.geo import GeoIndex
+from utils.topology import Topology
+
+__all__ = [
+    "GEOSTORE_DIR",
+    "GeoStore",
+    "store_path_for",
+    "build_geo_store",
+    "open_geo_store",
+]
+
+# lokasi file store hasil build (dibangun ulang otomatis bila GeoJSON sumber berubah)
+GEOSTORE_DIR = os.getenv("CLUSTER_GEOSTORE_DIR", os.path.join(".cache", "geo"))
+
+_MAGIC = b"GEOSTORE"
+_FORMAT_VERSION = 1
+_ALIGN = 16
+
+# Tata letak file:
+#   MAGIC (8 byte) | panjang header (uint64 LE) | header JSON | array mentah (rata 16 byte)
+# Header berisi offset/dtype/shape tiap array, skala & translasi kuantisasi, nama fitur,
+# geometri non-poligon (apa adanya), dan identitas file sumber (ukuran + mtime_ns).
+#
+# Array:
+#   arc_coords (n_titik, 2) int32   koordinat arc terkuantisasi, semua arc disambung
+#   arc_offsets (n_arc + 1)         awal tiap arc di arc_coords
+#   arc_min_interior (n_arc)        titik tengah minimum saat disederhanakan
+#   ring_arcs (n_ref) int32         referensi arc per ring (~a = arc a dibalik)
+#   ring_offsets (n_ring + 1)       awal tiap ring di ring_arcs
+#   poly_offsets (n_poly + 1)       awal tiap poligon di daftar ring
+#   feat_offsets (n_fitur + 1)      awal tiap fitur di daftar poligon
+#   feat_kind (n_fitur) int8        1 = poligon (lewat arc), 0 = geometri asli di header
+#   bboxes (n_fitur, 4), centroids (n_fitur, 2) float64
+#   props_blob uint8 + props_offsets (n_fitur + 1)   properti per fitur sebagai JSON
+
+class _Ragged(abc.Sequence):
+    """Sequence potongan values[offsets[i]:offsets[i+1]] tanpa menyalin."""
+
+    def __init__(self, values: np.ndarray, offsets: np.ndarray):
+        self.values = values
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.values[self.offsets[i]:self.offsets[i + 1]]
+
+class _Layout(abc.Sequence):
+    """geometries[i] ala Topology (list poligon -> ring -> ref arc), dirakit dari offset saat diakses."""
+
+    def __init__(self, store: "GeoStore"):
+        self._s = store
+
+    def __len__(self) -> int:
+        return len(self._s)
+
+    def __getitem__(self, i):
+        s = self._s
+        if not s._a["feat_kind"][i]:
+            return None
+        ring_off, ring_arcs, poly_off, feat_off = (s._a["ring_offsets"], s._a["ring_arcs"],
+                                                   s._a["poly_offsets"], s._a["feat_offsets"])
+        return [[ring_arcs[ring_off[r]:ring_off[r + 1]].tolist()
+                 for r in range(poly_off[p], poly_off[p + 1])]
+                for p in range(feat_off[i], feat_off[i + 1])]
+
+class _Originals(abc.Sequence):
+    def __init__(self, extras: Dict[str, Any], n: int):
+        self._extras = extras
+        self._n = n
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i):
+        return self._extras.get(str(i))
+
+class _Features(abc.Sequence):
+    """View fitur GeoJSON (dict Feature) yang di-decode per fitur saat diakses."""
+
+    def __init__(self, store: "GeoStore"):
+        self._s = store
+
+    def __len__(self) -> int:
+        return len(self._s)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self._s.feature(int(i))
+
+class GeoStore:
+    """
+    Store geometri biner hasil build dari GeoJSON, dibuka dengan memory-map:
+    tidak ada parsing JSON besar, halaman file dibagi antar proses oleh OS,
+    dan fitur hanya di-decode saat dipakai.
+
+    - topology: Topology (arc bersama terkuantisasi) langsung di atas array mmap
+    - names / bboxes / centroids: untuk GeoIndex tanpa membaca geometri
+    - features / to_geojson / __geo_interface__: view setara GeoJSON untuk folium
+      (koordinat hasil dekuantisasi, selisih < setengah langkah grid kuantisasi)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mm = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(self._mm[:8]) != _MAGIC:
+            raise ValueError(f"Bukan file GeoStore: {path}")
+        hlen = int(self._mm[8:16].view("<u8")[0])
+        self.header: Dict[str, Any] = json.loads(bytes(self._mm[16:16 + hlen]).decode("utf-8"))
+        if self.header.get("version") != _FORMAT_VERSION:
+            raise ValueError(f"Versi GeoStore tidak didukung: {self.header.get('version')}")
+        self._a: Dict[str, np.ndarray] = {}
+        for name, (off, dtype, shape) in self.header["arrays"].items():
+            dt = np.dtype(dtype)
+            nbytes = int(np.prod(shape, dtype=np.int64)) * dt.itemsize
+            self._a[name] = self._mm[off:off + nbytes].view(dt).reshape(shape)
+        self.names: List[str | None] = self.header["names"]
+        self.bboxes: np.ndarray = self._a["bboxes"]
+        self.centroids: np.ndarray = self._a["centroids"]
+        self.features = _Features(self)
+        self._topology: Topology | None = None
+
+    def __len__(self) -> int:
+        return int(self.header["n_features"])
+
+    @property
+    def source(self) -> Dict[str, int]:
+        return self.header["source"]
+
+    @property
+    def topology(self) -> Topology:
+        if self._topology is None:
+            self._topology = Topology(
+                _Ragged(self._a["arc_coords"], self._a["arc_offsets"]),
+                _Layout(self),
+                _Originals(self.header.get("extras") or {}, len(self)),
+                np.asarray(self.header["scale"]),
+                np.asarray(self.header["translate"]),
+                min_interior=self._a["arc_min_interior"],
+            )
+        return self._topology
+
+    def properties(self, i: int) -> dict:
+        off = self._a["props_offsets"]
+        return json.loads(bytes(self._a["props_blob"][off[i]:off[i + 1]]).decode("utf-8"))
+
+    def geometry(self, i: int) -> dict | None:
+        return self.topology.geometry(i, "penuh")
+
+    def feature(self, i: int) -> dict:
+        return {"type": "Feature", "properties": self.properties(i), "geometry": self.geometry(i)}
+
+    def to_geojson(self, ids: Iterable[int] | None = None) -> dict:
+        """FeatureCollection (semua fitur atau fitur ids saja)."""
+        ids = range(len(self)) if ids is None else ids
+        return {"type": "FeatureCollection", "features": [self.feature(int(i)) for i in ids]}
+
+    @property
+    def __geo_interface__(self) -> dict:
+        return self.to_geojson()
+
+    def geo_index(self) -> GeoIndex:
+        return GeoIndex(self.features, names=self.names, bboxes=self.bboxes, centroids=self.centroids)
+
+def store_path_for(geojson_path: str) -> str:
+    stem = os.path.splitext(os.path.basename(geojson_path))[0]
+    return os.path.join(GEOSTORE_DIR, f"{stem}.geostore")
+
+def _source_id(geojson_path: str) -> Dict[str, int]:
+    st_ = os.stat(geojson_path)
+    return {"size": int(st_.st_size), "mtime_ns": int(st_.st_mtime_ns)}
+
+def _ragged(chunks: List[np.ndarray], dtype, width: int | None = None):
+    sizes = np.fromiter((len(c) for c in chunks), dtype=np.int64, count=len(chunks))
+    offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    shape = (0, width) if width else (0,)
+    values = np.concatenate(chunks).astype(dtype) if chunks else np.zeros(shape, dtype=dtype)
+    return values, offsets
+
+def build_geo_store(geojson_path: str, store_path: str | None = None, quantization: int = 1_000_000) -> str:
+    """
+    Bangun store biner dari file GeoJSON (sekali; json.load hanya terjadi di sini).
+    File ditulis ke path sementara lalu os.replace, sehingga pembaca tidak melihat file setengah jadi.
+    Return: path store.
+    """
+    if quantization > 2 ** 31:
+        raise ValueError("quantization terlalu besar untuk koordinat int32.")
+    store_path = store_path or store_path_for(geojson_path)
+    source = _source_id(geojson_path)
+    with open(geojson_path, "r", encoding="utf-8") as f:
+        fc = json.load(f)
+    features = list(fc.get("features", []))
+    topo = Topology.from_geojson({"features": features}, quantization=quantization)
+    index = GeoIndex(features)
+
+    arc_coords, arc_offsets = _ragged(list(topo.arcs), np.int32, width=2)
+    rings, poly_sizes, feat_sizes = [], [], []
+    kind = np.zeros(len(features), dtype=np.int8)
+    extras: Dict[str, Any] = {}
+    for i, geom in enumerate(topo.geometries):
+        if geom is None:
+            feat_sizes.append(0)
+            if topo.originals[i] is not None:
+                extras[str(i)] = topo.originals[i]
+            continue
+        kind[i] = 1
+        feat_sizes.append(len(geom))
+        for poly in geom:
+            poly_sizes.append(len(poly))
+            rings.extend(np.asarray(r, dtype=np.int32) for r in poly)
+    ring_arcs, ring_offsets = _ragged(rings, np.int32)
+    poly_offsets = np.concatenate([[0], np.cumsum(poly_sizes, dtype=np.int64)])
+    feat_offsets = np.concatenate([[0], np.cumsum(feat_sizes, dtype=np.int64)])
+    props = [json.dumps(f.get("properties") or {}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+             for f in features]
+    props_blob = np.frombuffer(b"".join(props), dtype=np.uint8)
+    props_offsets = np.concatenate([[0], np.cumsum([len(p) for p in props], dtype=np.int64)])
+
+    arrays = {
+        "arc_coords": arc_coords,
+        "arc_offsets": arc_offsets,
+        "arc_min_interior": np.asarray(topo.min_interior, dtype=np.int32),
+        "ring_arcs": ring_arcs,
+        "ring_offsets": ring_offsets,
+        "poly_offsets": poly_offsets.astype(np.int64),
+        "feat_offsets": feat_offsets.astype(np.int64),
+        "feat_kind": kind,
+        "bboxes": index.bboxes,
+        "centroids": index.centroids,
+        "props_blob": props_blob,
+        "props_offsets": props_offsets.astype(np.int64),
+    }
+    header: Dict[str, Any] = {
+        "version": _FORMAT_VERSION,
+        "source": source,
+        "n_features": len(features),
+        "scale": topo.scale.tolist(),
+        "translate": topo.translate.tolist(),
+        "names": index.names,
+        "extras": extras,
+        "arrays": {},
+    }
+    # offset array bergantung pada panjang header -> hitung ulang sampai stabil
+    base = 0
+    while True:
+        off, layout = base, {}
+        for name, arr in arrays.items():
+            off = -(-off // _ALIGN) * _ALIGN
+            layout[name] = [off, arr.dtype.str, list(arr.shape)]
+            off += arr.nbytes
+        header["arrays"] = layout
+        hbytes = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        start = -(-(16 + len(hbytes)) // _ALIGN) * _ALIGN
+        if start == base:
+            break
+        base = start
+
+    os.makedirs(os.path.dirname(store_path) or ".", exist_ok=True)
+    tmp = f"{store_path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(_MAGIC)
+            f.write(np.uint64(len(hbytes)).astype("<u8").tobytes())
+            f.write(hbytes)
+            for name, arr in arrays.items():
+                f.write(b"\0" * (layout[name][0] - f.tell()))
+                f.write(np.ascontiguousarray(arr).tobytes())
+        os.replace(tmp, store_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return store_path
+
+def open_geo_store(geojson_path: str) -> GeoStore:
+    """Buka store untuk file GeoJSON; dibangun (ulang) bila belum ada atau sumber berubah."""
+    path = store_path_for(geojson_path)
+    if os.path.exists(path):
+        try:
+            store = GeoStore(path)
+            if store.source == _source_id(geojson_path):
+                return store
+        except (ValueError, KeyError, OSError):
+            pass  # format lama/rusak -> bangun ulang
+    return GeoStore(build_geo_store(geojson_path, path))
+
+if __name__ == "__main__":
+    # python -m utils.geostore <file.geojson> [<file.geostore>]
+    if len(sys.argv) < 2:
+        sys.exit("Pemakaian: python -m utils.geostore <file.geojson> [<file.geostore>]")
+    out = build_geo_store(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    store = GeoStore(out)
+    print(f"{out}: {len(store)} fitur, {len(store.topology.arcs)} arc, "
+          f"{os.path.getsize(out) / 1024:.1f} KB (GeoJSON {store.source['size'] / 1024:.1f} KB)")
@@ -0,0 +1,112 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from utils.algoritma import MinMaxScaler, KMeansCustom
+from utils.db_writer import StagedAppend, infer_column_types
+
+if TYPE_CHECKING:
+    from utils.model_store import ClusterModel
+
+__all__ = [
+    "DRIFT_RATIO_MAX",
+    "OUT_OF_RANGE_MAX",
+    "build_model_state",
+    "DriftTracker",
+    "append_rows",
+]
+
+# Ambang saran clustering ulang:
+# - rata-rata jarak kuadrat baris baru ke centroid > DRIFT_RATIO_MAX x rata-rata saat fit
+# - proporsi baris baru dengan fitur di luar rentang min/max saat fit > OUT_OF_RANGE_MAX
+DRIFT_RATIO_MAX = 1.5
+OUT_OF_RANGE_MAX = 0.10
+
+def build_model_state(scaler: MinMaxScaler, model: KMeansCustom, features: List[str],
+                      labels_map: Dict[int, str], n_rows: int) -> Dict[str, Any]:
+    """State lengkap yang dibutuhkan untuk memberi label baris baru tanpa fit ulang."""
+    km = model.get_state()
+    inertia = km["inertia"] or 0.0
+    return {
+        "features": list(features),
+        "k": model.n_clusters,
+        "labels_map": {str(c): lbl for c, lbl in labels_map.items()},
+        "scaler": scaler.get_state(),
+        "kmeans": km,
+        "n_rows": int(n_rows),
+        "baseline_msd": inertia / n_rows if n_rows else 0.0,
+    }
+
+class DriftTracker:
+    """Akumulasi metrik drift per chunk baris baru (dalam ruang fitur terskala)."""
+
+    def __init__(self, baseline_msd: float):
+        self.baseline_msd = float(baseline_msd)
+        self.n_rows = 0
+        self._sq_sum = 0.0
+        self._out_of_range = 0
+
+    def update(self, X: np.ndarray, labels: np.ndarray, centroids: np.ndarray):
+        diff = X - centroids[labels]
+        self._sq_sum += float(np.einsum("ij,ij->", diff, diff))
+        self._out_of_range += int(((X < -1e-9) | (X > 1 + 1e-9)).any(axis=1).sum())
+        self.n_rows += X.shape[0]
+
+    def report(self) -> Dict[str, Any]:
+        msd = self._sq_sum / self.n_rows if self.n_rows else 0.0
+        ratio = msd / self.baseline_msd if self.baseline_msd > 0 else (np.inf if msd > 0 else 1.0)
+        oor = self._out_of_range / self.n_rows if self.n_rows else 0.0
+        return {
+            "n_rows": self.n_rows,
+            "mean_sq_dist": msd,
+            "baseline_msd": self.baseline_msd,
+            "ratio": float(ratio),
+            "out_of_range": oor,
+            "refit": bool(ratio > DRIFT_RATIO_MAX or oor > OUT_OF_RANGE_MAX),
+        }
+
+def append_rows(engine, table_name: str, chunks: Iterable[pd.DataFrame],
+                column_types: Dict[str, str], model: "ClusterModel | None" = None) -> Dict[str, Any]:
+    """
+    Tambahkan baris baru ke `table_name`. Bila model (registry) tersedia, baris baru juga diberi
+    cluster & Keterangan dengan scaler + centroid tersimpan (predict saja, tanpa sweep) lalu
+    ditambahkan ke `<table>_clustered`. Biaya O(baris baru).
+    Kolom target diperlebar lebih dulu bila tipe file baru lebih lebar, dan kedua tabel ditulis
+    lewat StagedAppend sehingga keduanya berubah bersama atau tidak sama sekali.
+    Return: {rows, nbytes, drift (None bila tanpa model)}.
+    """
+    rows, nbytes = 0, 0
+    drift = None
+    targets = {table_name: column_types}
+    if model is not None:
+        drift = DriftTracker(model.baseline_msd)
+        clustered_table = f"{table_name}_clustered"
+        label_types = infer_column_types(pd.DataFrame({
+            "Cluster": np.arange(model.k, dtype=np.int64),
+            "Keterangan": [model.labels_map.get(c, "") for c in range(model.k)],
+        }))
+        targets[clustered_table] = {
+            **{c: column_types[c] for c in ["KECAMATAN"] + model.features},
+            **label_types,
+        }
+
+    with StagedAppend(engine, targets) as stage:
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            stage.write(table_name, chunk)
+            rows += len(chunk)
+            nbytes += int(chunk.memory_usage(index=False, deep=True).sum())
+            if model is None:
+                continue
+            X = model.transform(chunk)
+            labels = model.kmeans.predict(X)
+            drift.update(X, labels, model.centroids)
+            labeled = chunk[["KECAMATAN"] + model.features].copy()
+            labeled["Cluster"] = labels
+            labeled["Keterangan"] = pd.Series(labels, index=labeled.index).map(model.labels_map)
+            stage.write(clustered_table, labeled)
+
+    return {"rows": rows, "nbytes": nbytes, "drift": drift.report() if drift else None}
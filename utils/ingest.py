@@ -0,0 +1,125 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterator
+
+import numpy as np
+import pandas as pd
+
+from utils.baca_file import iter_file_chunks, CHUNK_ROWS
+from utils.db_writer import infer_column_types
+
+__all__ = [
+    "scan_upload",
+    "prepare_chunk",
+    "iter_prepared_chunks",
+    "upload_column_types",
+]
+
+_INT_DTYPES = (np.int16, np.int32, np.int64)
+
+def _is_num(s: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s)
+
+def scan_upload(uploaded_file, rename: Dict[str, str], chunksize: int = CHUNK_ROWS) -> Dict[str, Any]:
+    """
+    Pass pertama (streaming): kumpulkan statistik per kolom tanpa menyimpan data.
+    - kolom numerik (numerik di semua chunk), mean dari nilai valid & bukan nol,
+      apakah ada NaN/nol yang perlu diisi, apakah seluruh nilainya bilangan bulat, min/max
+    - panjang string maksimum untuk kolom teks
+    """
+    n_rows = 0
+    columns: list[str] | None = None
+    numeric: Dict[str, bool] = {}
+    sums: Dict[str, float] = {}
+    counts: Dict[str, int] = {}
+    needs_fill: Dict[str, bool] = {}
+    integral: Dict[str, bool] = {}
+    mins: Dict[str, float] = {}
+    maxs: Dict[str, float] = {}
+    str_len: Dict[str, int] = {}
+
+    for chunk in iter_file_chunks(uploaded_file, chunksize):
+        chunk = chunk.rename(columns=rename)
+        if columns is None:
+            columns = list(chunk.columns)
+            numeric = {c: True for c in columns}
+        n_rows += len(chunk)
+        for col in columns:
+            s = chunk[col]
+            if numeric[col] and not _is_num(s) and s.notna().any():
+                numeric[col] = False
+            # panjang teks diukur di setiap chunk: kolom yang baru menjadi teks di chunk
+            # belakang tetap memuat nilai dari chunk awal yang tadinya tampak numerik
+            lens = s.dropna().astype(str).str.len()
+            if len(lens):
+                str_len[col] = max(str_len.get(col, 0), int(lens.max()))
+            if not (numeric[col] and _is_num(s)):
+                continue
+            v = s.to_numpy(dtype=np.float64, na_value=np.nan)
+            valid = ~np.isnan(v)
+            good = valid & (v != 0)
+            sums[col] = sums.get(col, 0.0) + float(v[good].sum())
+            counts[col] = counts.get(col, 0) + int(good.sum())
+            needs_fill[col] = needs_fill.get(col, False) or bool((~good).any())
+            integral[col] = integral.get(col, True) and bool(np.all(v[valid] == np.round(v[valid])))
+            if valid.any():
+                mins[col] = min(mins.get(col, np.inf), float(v[valid].min()))
+                maxs[col] = max(maxs.get(col, -np.inf), float(v[valid].max()))
+
+    num_cols = [c for c in (columns or []) if numeric[c]]
+    means = {c: (sums.get(c, 0.0) / counts[c]) if counts.get(c) else 0.0 for c in num_cols}
+    # kolom bulat tanpa nilai yang perlu diisi bisa disimpan sebagai integer
+    int_dtype: Dict[str, str] = {}
+    for c in num_cols:
+        if integral.get(c, True) and not needs_fill.get(c, False) and c in mins:
+            for dt in _INT_DTYPES:
+                info = np.iinfo(dt)
+                if info.min <= mins[c] and maxs[c] <= info.max:
+                    int_dtype[c] = np.dtype(dt).name
+                    break
+    return {
+        "rename": dict(rename),
+        "columns": columns or [],
+        "n_rows": n_rows,
+        "numeric": num_cols,
+        "means": means,
+        "filled": [c for c in num_cols if needs_fill.get(c, False)],
+        "int_dtype": int_dtype,
+        "str_len": {c: str_len.get(c, 0) for c in (columns or []) if c not in num_cols},
+    }
+
+def prepare_chunk(chunk: pd.DataFrame, stats: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Terapkan rename, imputasi NaN & nol ke mean kolom, pembulatan 2 desimal,
+    dan downcast tipe (kolom bulat -> integer terkecil) secara vektor per chunk.
+    """
+    chunk = chunk.rename(columns=stats["rename"])
+    out: Dict[str, Any] = {}
+    filled = set(stats["filled"])
+    for col in stats["columns"]:
+        s = chunk[col]
+        if col in stats["int_dtype"]:
+            out[col] = s.astype(stats["int_dtype"][col])
+        elif col in stats["means"]:
+            v = pd.to_numeric(s, errors="coerce").astype(np.float64)
+            if col in filled:
+                v = v.mask(v.isna() | (v == 0), stats["means"][col])
+            out[col] = v.round(2)
+        else:
+            out[col] = s.astype(object).where(s.notna(), None)
+    return pd.DataFrame(out, index=chunk.index)
+
+def iter_prepared_chunks(uploaded_file, stats: Dict[str, Any], chunksize: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Pass kedua: chunk siap tulis, langsung diteruskan ke bulk_write."""
+    for chunk in iter_file_chunks(uploaded_file, chunksize):
+        yield prepare_chunk(chunk, stats)
+
+def upload_column_types(stats: Dict[str, Any]) -> Dict[str, str]:
+    """Tipe kolom MySQL berdasarkan statistik seluruh file (bukan hanya satu chunk)."""
+    sample = pd.DataFrame({
+        c: pd.Series(dtype=stats["int_dtype"].get(c, "float64")) if c in stats["means"] else pd.Series(dtype=object)
+        for c in stats["columns"]
+    })
+    types = infer_column_types(sample, str_lengths=stats["str_len"])
+    for c, dt in stats["int_dtype"].items():
+        types[c] = {"int16": "SMALLINT", "int32": "INT"}.get(dt, "BIGINT")
+    return types
@@ -0,0 +1,81 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+__all__ = [
+    "ConcurrentLoader",
+]
+
+# pool bersama per proses; tugas di sini I/O-bound (query DB, baca file) sehingga thread cukup
+LOADER_WORKERS = int(os.getenv("LOADER_WORKERS", "8"))
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=LOADER_WORKERS, thread_name_prefix="loader")
+    return _executor
+
+def _script_ctx_binder() -> Callable[[], None]:
+    # fungsi st.cache_* yang dipanggil dari thread worker butuh konteks script Streamlit
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+    except Exception:
+        return lambda: None
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return lambda: None
+    return lambda: add_script_run_ctx(threading.current_thread(), ctx)
+
+class ConcurrentLoader:
+    """
+    Jalankan beberapa tugas muat yang saling independen (query DB, baca file) bersamaan.
+    Latensi total ~ tugas paling lambat; waktu tiap tugas tersedia di `timings`.
+
+        loader = ConcurrentLoader()
+        loader.submit("geojson", load_geojson)
+        loader.submit("data", read_columns, engine, table, cols)
+        geojson = loader.result("geojson")  # exception tugas dilempar ulang di sini
+    """
+
+    def __init__(self):
+        self._futures: Dict[str, Future] = {}
+        self._bind_ctx = _script_ctx_binder()
+        self.timings: Dict[str, float] = {}
+        self._t0 = time.perf_counter()
+
+    def _run(self, name: str, fn: Callable[..., Any], args, kwargs) -> Any:
+        self._bind_ctx()
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.timings[name] = time.perf_counter() - t0
+
+    def submit(self, name: str, fn: Callable[..., Any], *args, **kwargs) -> "ConcurrentLoader":
+        if name in self._futures:
+            raise ValueError(f"Tugas '{name}' sudah ada.")
+        self._futures[name] = _get_executor().submit(self._run, name, fn, args, kwargs)
+        return self
+
+    def result(self, name: str) -> Any:
+        return self._futures[name].result()
+
+    def wait(self) -> Dict[str, float]:
+        """Tunggu semua tugas selesai (sukses atau gagal). Return: timings."""
+        for fut in self._futures.values():
+            fut.exception()
+        # urut sesuai urutan submit, bukan urutan selesai
+        return {name: self.timings[name] for name in self._futures}
+
+    @property
+    def elapsed(self) -> float:
+        """Waktu dinding sejak loader dibuat."""
+        return time.perf_counter() - self._t0
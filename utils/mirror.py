@@ -0,0 +1,187 @@
+from __future__ import annotations
+import glob
+import json
+import os
+import uuid
+from typing import Dict, Iterable, Iterator, Sequence
+
+import pandas as pd
+
+from utils.checksum import ChunkDigest
+
+try:  # pyarrow opsional; tanpa pyarrow semua pembacaan kembali ke DB
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # pragma: no cover
+    pa = None
+
+__all__ = [
+    "mirror_enabled",
+    "MirrorWriter",
+    "mirror_version",
+    "mirror_schema",
+    "read_mirror",
+    "drop_mirror",
+]
+
+# CLUSTER_MIRROR_DIR="" mematikan mirror
+MIRROR_DIR = os.getenv("CLUSTER_MIRROR_DIR", os.path.join(".cache", "mirror"))
+
+_META_TYPES = b"column_types"
+
+def mirror_enabled() -> bool:
+    return pa is not None and bool(MIRROR_DIR)
+
+def _files(table: str) -> list[str]:
+    # nama tabel hanya [a-z0-9_], jadi "<tabel>.*" tidak ikut mencocokkan "<tabel>_clustered.*"
+    paths = glob.glob(os.path.join(MIRROR_DIR, f"{glob.escape(table)}.*.arrow"))
+    return sorted(paths, key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0.0, reverse=True)
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        # file masih di-mmap pembaca lain (Windows); dibersihkan pada penulisan berikutnya
+        pass
+
+def _arrow_type(sql_type: str):
+    t = sql_type.upper()
+    if t.startswith("TINYINT(1)"):
+        return pa.bool_()
+    base = t.split("(", 1)[0]
+    return {
+        "SMALLINT": pa.int16(),
+        "INT": pa.int32(),
+        "BIGINT": pa.int64(),
+        "FLOAT": pa.float32(),
+        "DOUBLE": pa.float64(),
+        "DATETIME": pa.timestamp("us"),
+    }.get(base, pa.string())
+
+class MirrorWriter:
+    """
+    Menulis salinan Arrow IPC (tanpa kompresi, bisa di-mmap) dari tabel yang sedang
+    ditulis ke DB. Chunk dilewatkan lewat tee(); file baru terlihat pembaca setelah
+    commit(), dengan nama "<tabel>.<versi>.arrow" di mana versi = checksum isi
+    (ChunkDigest, sama dengan checksum di katalog _datasets_meta).
+    Kegagalan menulis mirror tidak pernah menggagalkan penulisan ke DB.
+    """
+
+    def __init__(self, table: str, column_types: Dict[str, str]):
+        self.table = table
+        self.column_types = dict(column_types)
+        self._digest = ChunkDigest(self.column_types)
+        self._tmp = os.path.join(MIRROR_DIR, f".{table}.{uuid.uuid4().hex[:8]}.tmp")
+        self._schema = pa.schema(
+            [(c, _arrow_type(t)) for c, t in self.column_types.items()],
+            metadata={_META_TYPES: json.dumps(self.column_types).encode()},
+        )
+        self._sink = None
+        self._writer = None
+        self._failed = False
+
+    def _write(self, chunk: pd.DataFrame):
+        if self._writer is None:
+            os.makedirs(MIRROR_DIR, exist_ok=True)
+            self._sink = pa.OSFile(self._tmp, "wb")
+            self._writer = pa_ipc.new_file(self._sink, self._schema)
+        batch = pa.RecordBatch.from_pandas(chunk, schema=self._schema, preserve_index=False)
+        self._writer.write_batch(batch)
+        self._digest.update(chunk)
+
+    def tee(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        for chunk in chunks:
+            if not self._failed and not chunk.empty:
+                try:
+                    self._write(chunk)
+                except Exception:
+                    self._failed = True
+            yield chunk
+
+    def _close(self):
+        for obj in (self._writer, self._sink):
+            try:
+                if obj is not None:
+                    obj.close()
+            except Exception:
+                pass
+        self._writer = self._sink = None
+
+    def commit(self) -> str | None:
+        """Terbitkan versi baru dan hapus versi lama. Return: versi, atau None bila gagal."""
+        try:
+            if self._failed:
+                raise RuntimeError("mirror tidak lengkap")
+            if self._writer is None:  # tabel kosong
+                self._write(pd.DataFrame({c: pd.Series(dtype=object) for c in self.column_types}))
+            self._close()
+            version = self._digest.checksum
+            final = os.path.join(MIRROR_DIR, f"{self.table}.{version}.arrow")
+            if os.path.exists(final):
+                # isi sama persis dengan versi yang sudah ada; cukup jadikan yang terbaru
+                _remove(self._tmp)
+                os.utime(final)
+            else:
+                os.replace(self._tmp, final)
+        except Exception:
+            self.abort()
+            drop_mirror(self.table)  # versi lama sudah tidak sesuai isi DB
+            return None
+        for path in _files(self.table):
+            if os.path.basename(path) != os.path.basename(final):
+                _remove(path)
+        return version
+
+    def abort(self):
+        self._close()
+        _remove(self._tmp)
+
+def _current(table: str) -> str | None:
+    if not mirror_enabled():
+        return None
+    files = _files(table)
+    return files[0] if files else None
+
+def mirror_version(table: str) -> str | None:
+    """Versi isi mirror terbaru (hash data), None bila tabel tidak punya mirror."""
+    path = _current(table)
+    return os.path.basename(path).rsplit(".", 2)[1] if path else None
+
+def mirror_schema(table: str) -> Dict[str, str] | None:
+    """Nama kolom -> DATA_TYPE (format information_schema) dari footer file mirror."""
+    path = _current(table)
+    if path is None:
+        return None
+    try:
+        with pa.memory_map(path) as src:
+            meta = pa_ipc.open_file(src).schema.metadata or {}
+        types = json.loads(meta[_META_TYPES])
+    except Exception:
+        return None
+    return {c: t.split("(", 1)[0].strip().lower() for c, t in types.items()}
+
+def read_mirror(table: str, columns: Sequence[str] | None = None, limit: int | None = None) -> pd.DataFrame | None:
+    """
+    Baca kolom yang diminta dari mirror lewat memory map: hanya halaman kolom tersebut
+    yang dibaca dari disk, tanpa salinan perantara. None bila mirror tidak tersedia.
+    """
+    path = _current(table)
+    if path is None:
+        return None
+    try:
+        with pa.memory_map(path) as src:
+            data = pa_ipc.open_file(src).read_all()
+            if columns:
+                data = data.select(list(columns))
+            if limit is not None:
+                data = data.slice(0, int(limit))
+            return data.to_pandas(split_blocks=True)
+    except Exception:
+        return None
+
+def drop_mirror(table: str):
+    """Hapus semua versi mirror tabel (overwrite gagal, append, atau kedaluwarsa)."""
+    if not MIRROR_DIR:
+        return
+    for path in _files(table):
+        _remove(path)
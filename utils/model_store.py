@@ -0,0 +1,169 @@
+from __future__ import annotations
+import json
+import threading
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from utils.algoritma import MinMaxScaler, KMeansCustom
+from utils.cache import LRUCache
+
+__all__ = [
+    "MODEL_TABLE",
+    "ClusterModel",
+    "save_model",
+    "load_model",
+    "get_model",
+    "list_model_versions",
+    "delete_models",
+]
+
+MODEL_TABLE = "_cluster_models"
+# versi lama yang disimpan per dataset (yang lebih tua dihapus saat menyimpan versi baru)
+MODEL_KEEP_VERSIONS = 5
+
+_ready = False
+_lock = threading.Lock()
+# ClusterModel hasil load, per (tabel, versi); versi tidak pernah berubah isinya
+_models = LRUCache(max_entries=64, max_bytes=64 * 1024 * 1024)
+
+class ClusterModel:
+    """
+    Model siap pakai untuk memberi label baris baru/diedit tanpa data asli:
+    MinMaxScaler + centroid KMeansCustom + fitur + label map.
+    """
+
+    def __init__(self, state: Dict[str, Any], version: int | None = None):
+        self.state = state
+        self.version = version
+        self.features: List[str] = list(state["features"])
+        self.k = int(state["k"])
+        self.labels_map = {int(c): lbl for c, lbl in state["labels_map"].items()}
+        self.baseline_msd = float(state.get("baseline_msd") or 0.0)
+        self.scaler = MinMaxScaler.from_state(state["scaler"])
+        self.kmeans = KMeansCustom.from_state(state["kmeans"])
+
+    @property
+    def centroids(self) -> np.ndarray:
+        return self.kmeans.centroids
+
+    def transform(self, df: pd.DataFrame) -> np.ndarray:
+        missing = [c for c in self.features if c not in df.columns]
+        if missing:
+            raise KeyError("Kolom fitur tidak ada: " + ", ".join(missing))
+        return self.scaler.transform(df[self.features])
+
+    def predict(self, df: pd.DataFrame) -> np.ndarray:
+        """Nomor cluster untuk tiap baris df (kolom fitur sesuai model)."""
+        return self.kmeans.predict(self.transform(df))
+
+    def label(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Salinan df dengan kolom Cluster & Keterangan."""
+        labels = self.predict(df)
+        out = df.copy()
+        out["Cluster"] = labels
+        out["Keterangan"] = pd.Series(labels, index=out.index).map(self.labels_map)
+        return out
+
+def _ensure_table(engine):
+    """Buat tabel registry sekali per proses."""
+    global _ready
+    if _ready:
+        return
+    with _lock:
+        if _ready:
+            return
+        with engine.begin() as conn:
+            conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS `{MODEL_TABLE}` (
+                  table_name  VARCHAR(128) NOT NULL,
+                  version     INT NOT NULL,
+                  k           SMALLINT NOT NULL,
+                  features    TEXT NOT NULL,
+                  state       MEDIUMTEXT NOT NULL,
+                  created_at  DATETIME NOT NULL,
+                  PRIMARY KEY (table_name, version)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """))
+        _ready = True
+
+def save_model(engine, table_name: str, state: Dict[str, Any]) -> int:
+    """
+    Simpan state model (fitur, k, label map, MinMaxScaler.get_state, KMeansCustom.get_state,
+    baseline drift) sebagai versi baru untuk dataset. Return: nomor versi.
+    """
+    _ensure_table(engine)
+    with engine.begin() as conn:
+        # kunci baris dataset agar dua penyimpanan bersamaan tidak mendapat versi sama
+        latest = conn.execute(text(f"""
+            SELECT COALESCE(MAX(version), 0) FROM `{MODEL_TABLE}` WHERE table_name = :t FOR UPDATE
+        """), {"t": table_name}).scalar()
+        version = int(latest) + 1
+        conn.execute(text(f"""
+            INSERT INTO `{MODEL_TABLE}` (table_name, version, k, features, state, created_at)
+            VALUES (:t, :v, :k, :features, :state, NOW())
+        """), {"t": table_name, "v": version, "k": int(state["k"]),
+               "features": json.dumps(list(state["features"])), "state": json.dumps(state)})
+        conn.execute(text(f"""
+            DELETE FROM `{MODEL_TABLE}` WHERE table_name = :t AND version <= :old
+        """), {"t": table_name, "old": version - MODEL_KEEP_VERSIONS})
+    return version
+
+def _latest_version(engine, table_name: str) -> int | None:
+    with engine.connect() as conn:
+        v = conn.execute(text(f"SELECT MAX(version) FROM `{MODEL_TABLE}` WHERE table_name = :t"),
+                         {"t": table_name}).scalar()
+    return int(v) if v is not None else None
+
+def get_model(engine, table_name: str, version: int | None = None) -> ClusterModel | None:
+    """
+    ClusterModel untuk dataset (versi terbaru bila version=None); None bila belum ada.
+    Versi yang sudah pernah dimuat diambil dari cache proses tanpa parsing ulang.
+    """
+    _ensure_table(engine)
+    if version is None:
+        version = _latest_version(engine, table_name)
+        if version is None:
+            return None
+    key = f"{table_name}@{version}"
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with engine.connect() as conn:
+        row = conn.execute(text(f"""
+            SELECT state FROM `{MODEL_TABLE}` WHERE table_name = :t AND version = :v
+        """), {"t": table_name, "v": int(version)}).fetchone()
+    if row is None:
+        return None
+    model = ClusterModel(json.loads(row[0]), version=int(version))
+    _models.put(key, model)
+    return model
+
+def load_model(engine, table_name: str, version: int | None = None) -> Dict[str, Any] | None:
+    """State mentah model (lihat get_model untuk objek siap predict)."""
+    model = get_model(engine, table_name, version)
+    return model.state if model is not None else None
+
+def list_model_versions(engine, table_name: str) -> List[Dict[str, Any]]:
+    """Riwayat versi model dataset, terbaru lebih dulu."""
+    _ensure_table(engine)
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"""
+            SELECT version, k, features, created_at FROM `{MODEL_TABLE}`
+            WHERE table_name = :t ORDER BY version DESC
+        """), {"t": table_name}).fetchall()
+    return [{"version": v, "k": k, "features": json.loads(f) if f else None, "created_at": c}
+            for v, k, f, c in rows]
+
+def delete_models(engine, table_names: Iterable[str]):
+    names = list(table_names)
+    if not names:
+        return
+    _ensure_table(engine)
+    params = {f"t{i}": t for i, t in enumerate(names)}
+    with engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM `{MODEL_TABLE}` WHERE table_name IN ({', '.join(':' + k for k in params)})"),
+                     params)
+    _models.invalidate(predicate=lambda key: key.rsplit("@", 1)[0] in names)
@@ -1,55 +1,298 @@
+import json
+import threading
+import time
 from sqlalchemy import text
+from utils.cache import get_map_cache
+from utils.mirror import drop_mirror
+from utils.model_store import delete_models
 
 METADATA_TABLE = "_datasets_meta"
 
+# Kolom katalog yang ditambahkan di atas skema awal (table_name, created_at, expires_at).
+# Tabel lama dimigrasi dengan ALTER TABLE saat ensure_meta_table pertama kali jalan.
+_CATALOG_COLUMNS = {
+    "row_count":        "BIGINT NULL",
+    "column_schema":    "TEXT NULL",
+    "byte_size":        "BIGINT NULL",
+    "checksum":         "CHAR(16) NULL",
+    "clustered_table":  "VARCHAR(128) NULL",
+    "cluster_k":        "SMALLINT NULL",
+    "cluster_features": "TEXT NULL",
+    "clustered_at":     "DATETIME NULL",
+    "clustered_checksum": "CHAR(16) NULL",
+}
+
+_CATALOG_SELECT = f"""
+    SELECT table_name, created_at, expires_at, DATEDIFF(expires_at, NOW()) AS days_left,
+           row_count, column_schema, byte_size, checksum,
+           clustered_table, cluster_k, cluster_features, clustered_at
+    FROM `{METADATA_TABLE}`
+"""
+
 def ensure_meta_table(engine):
-    """Buat tabel metadata bila belum ada."""
+    """Buat tabel metadata (katalog) bila belum ada, dan lengkapi kolom katalog pada tabel lama."""
+    cols = ",\n              ".join(f"{c} {t}" for c, t in _CATALOG_COLUMNS.items())
     with engine.begin() as conn:
         conn.execute(text(f"""
             CREATE TABLE IF NOT EXISTS `{METADATA_TABLE}` (
               table_name   VARCHAR(128) NOT NULL PRIMARY KEY,
               created_at   DATETIME NOT NULL,
-              expires_at   DATETIME NOT NULL
+              expires_at   DATETIME NOT NULL,
+              {cols},
+              KEY idx_expires_at (expires_at),
+              KEY idx_clustered_table (clustered_table)
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
         """))
+        existing = {r[0] for r in conn.execute(text("""
+            SELECT COLUMN_NAME FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = :t
+        """), {"t": METADATA_TABLE})}
+        missing = [c for c in _CATALOG_COLUMNS if c not in existing]
+        if missing:
+            _migrate_catalog(conn, missing)
+
+# DDL tabel metadata hanya dijalankan sekali per proses (saat startup / pemanggilan pertama)
+_meta_ready = False
+_meta_lock = threading.Lock()
+
+def _ensure_meta_once(engine):
+    global _meta_ready
+    if _meta_ready:
+        return
+    with _meta_lock:
+        if not _meta_ready:
+            ensure_meta_table(engine)
+            _meta_ready = True
+
+def _migrate_catalog(conn, missing):
+    """Tambah kolom katalog ke tabel metadata versi lama lalu isi dari tabel yang sudah ada."""
+    indexes = {r[0] for r in conn.execute(text("""
+        SELECT INDEX_NAME FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = :t
+    """), {"t": METADATA_TABLE})}
+    alters = [f"ADD COLUMN {c} {_CATALOG_COLUMNS[c]}" for c in missing]
+    if "idx_expires_at" not in indexes:
+        alters.append("ADD KEY idx_expires_at (expires_at)")
+    if "idx_clustered_table" not in indexes:
+        alters.append("ADD KEY idx_clustered_table (clustered_table)")
+    conn.execute(text(f"ALTER TABLE `{METADATA_TABLE}` {', '.join(alters)}"))
+    # sekali jalan: jumlah baris (perkiraan InnoDB) & ukuran, serta tautan ke tabel _clustered
+    conn.execute(text(f"""
+        UPDATE `{METADATA_TABLE}` m
+        JOIN information_schema.tables t
+          ON t.table_schema = DATABASE() AND t.table_name = m.table_name
+        SET m.row_count = COALESCE(m.row_count, t.TABLE_ROWS),
+            m.byte_size = COALESCE(m.byte_size, t.DATA_LENGTH + t.INDEX_LENGTH)
+    """))
+    conn.execute(text(f"""
+        UPDATE `{METADATA_TABLE}` m
+        JOIN information_schema.tables t
+          ON t.table_schema = DATABASE() AND t.table_name = CONCAT(m.table_name, '_clustered')
+        SET m.clustered_table = t.table_name
+        WHERE m.clustered_table IS NULL
+    """))
 
-def register_dataset(engine, table_name: str, retention_days: int = 1):
+def register_dataset(engine, table_name: str, retention_days: int = 1,
+                     row_count: int | None = None, column_types: dict | None = None,
+                     byte_size: int | None = None, checksum: str | None = None):
     """
-    Catat/refresh metadata untuk dataset yang baru disimpan/di-overwrite.
+    Catat/refresh metadata untuk dataset yang baru disimpan/di-overwrite,
+    termasuk ringkasan katalog (jumlah baris, skema kolom, ukuran, checksum isi).
+    Saat overwrite, tautan hasil clustering lama dilepas dan model tersimpannya dihapus
+    karena dibuat dari data yang diganti.
     """
-    ensure_meta_table(engine)
+    _ensure_meta_once(engine)
     with engine.begin() as conn:
         conn.execute(text(f"""
-            INSERT INTO `{METADATA_TABLE}` (table_name, created_at, expires_at)
-            VALUES (:t, NOW(), DATE_ADD(NOW(), INTERVAL :days DAY))
+            INSERT INTO `{METADATA_TABLE}`
+              (table_name, created_at, expires_at, row_count, column_schema, byte_size, checksum)
+            VALUES (:t, NOW(), DATE_ADD(NOW(), INTERVAL :days DAY), :rows, :schema, :bytes, :checksum)
             ON DUPLICATE KEY UPDATE
               created_at = VALUES(created_at),
-              expires_at = VALUES(expires_at)
-        """), {"t": table_name, "days": retention_days})
+              expires_at = VALUES(expires_at),
+              row_count = VALUES(row_count),
+              column_schema = VALUES(column_schema),
+              byte_size = VALUES(byte_size),
+              checksum = VALUES(checksum),
+              clustered_table = NULL,
+              cluster_k = NULL,
+              cluster_features = NULL,
+              clustered_at = NULL,
+              clustered_checksum = NULL
+        """), {
+            "t": table_name, "days": retention_days, "rows": row_count,
+            "schema": json.dumps(column_types) if column_types is not None else None,
+            "bytes": byte_size, "checksum": checksum,
+        })
+    # append_rows tidak boleh memberi label dengan model dari data lama
+    delete_models(engine, [table_name])
+
+def register_clustered(engine, table_name: str, clustered_table: str, k: int, features: list,
+                       retention_days: int = 1, checksum: str | None = None):
+    """
+    Tautkan hasil clustering (tabel, k, fitur, checksum isi) ke entri dataset asalnya di katalog.
+    """
+    _ensure_meta_once(engine)
+    with engine.begin() as conn:
+        # dataset lama yang belum tercatat ikut didaftarkan dengan masa simpan default
+        conn.execute(text(f"""
+            INSERT INTO `{METADATA_TABLE}`
+              (table_name, created_at, expires_at, clustered_table, cluster_k, cluster_features,
+               clustered_at, clustered_checksum)
+            VALUES (:t, NOW(), DATE_ADD(NOW(), INTERVAL :days DAY), :ct, :k, :features, NOW(), :checksum)
+            ON DUPLICATE KEY UPDATE
+              clustered_table = VALUES(clustered_table),
+              cluster_k = VALUES(cluster_k),
+              cluster_features = VALUES(cluster_features),
+              clustered_at = VALUES(clustered_at),
+              clustered_checksum = VALUES(clustered_checksum)
+        """), {
+            "t": table_name, "days": retention_days, "ct": clustered_table,
+            "k": int(k), "features": json.dumps(list(features)), "checksum": checksum,
+        })
+
+def register_append(engine, table_name: str, rows: int, byte_size: int, clustered: bool = False):
+    """
+    Perbarui ringkasan katalog setelah baris ditambahkan (checksum isi tidak lagi berlaku).
+    clustered=True: `<tabel>_clustered` ikut bertambah -> clustered_at diperbarui agar
+    cache yang dikunci clustered_at (preview dataset) membaca ulang.
+    """
+    _ensure_meta_once(engine)
+    clustered_at = ", clustered_at = NOW(), clustered_checksum = NULL" if clustered else ""
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            UPDATE `{METADATA_TABLE}`
+            SET row_count = COALESCE(row_count, 0) + :rows,
+                byte_size = COALESCE(byte_size, 0) + :bytes,
+                checksum = NULL{clustered_at}
+            WHERE table_name = :t
+        """), {"t": table_name, "rows": int(rows), "bytes": int(byte_size)})
+
+def _catalog_row(row) -> dict:
+    entry = dict(row._mapping)
+    for key in ("column_schema", "cluster_features"):
+        entry[key] = json.loads(entry[key]) if entry.get(key) else None
+    return entry
+
+def list_catalog(engine, clustered_only: bool = False) -> list[dict]:
+    """Daftar dataset dari katalog (satu query, tanpa menyentuh tabel data)."""
+    _ensure_meta_once(engine)
+    where = " WHERE clustered_table IS NOT NULL" if clustered_only else ""
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"{_CATALOG_SELECT}{where} ORDER BY table_name")).fetchall()
+    return [_catalog_row(r) for r in rows]
+
+def catalog_entry(engine, table_name: str) -> dict | None:
+    """Entri katalog untuk satu dataset (lookup primary key); None jika tidak tercatat."""
+    _ensure_meta_once(engine)
+    with engine.connect() as conn:
+        row = conn.execute(text(f"{_CATALOG_SELECT} WHERE table_name = :t"), {"t": table_name}).fetchone()
+    return _catalog_row(row) if row else None
+
+def catalog_checksum(engine, table: str) -> str | None:
+    """
+    Checksum isi tabel menurut katalog: kolom checksum untuk dataset, clustered_checksum untuk
+    tabel `_clustered`-nya. None bila tidak tercatat atau isi berubah sejak checksum dihitung.
+    """
+    _ensure_meta_once(engine)
+    with engine.connect() as conn:
+        row = conn.execute(text(f"""
+            SELECT CASE WHEN table_name = :t THEN checksum ELSE clustered_checksum END
+            FROM `{METADATA_TABLE}` WHERE table_name = :t OR clustered_table = :t
+            LIMIT 1
+        """), {"t": table}).fetchone()
+    return row[0] if row else None
+
+def dataset_exists(engine, table_name: str) -> bool:
+    """Cek keberadaan dataset lewat katalog, bukan information_schema."""
+    return catalog_entry(engine, table_name) is not None
 
 def cleanup_expired_datasets(engine, also_drop_clustered: bool = True):
     """
     Hapus tabel yang sudah lewat expires_at dan bersihkan catatannya.
+    Semua tabel kedaluwarsa di-DROP dalam satu statement.
     Return: list nama tabel yang dihapus.
     """
-    ensure_meta_table(engine)
-    removed = []
+    _ensure_meta_once(engine)
     with engine.begin() as conn:
-        rows = conn.execute(text(f"SELECT table_name FROM `{METADATA_TABLE}` WHERE expires_at <= NOW()")).fetchall()
-        for (tname,) in rows:
-            conn.execute(text(f"DROP TABLE IF EXISTS `{tname}`"))
-            if also_drop_clustered:
-                conn.execute(text(f"DROP TABLE IF EXISTS `{tname}_clustered`"))
-            removed.append(tname)
-        if rows:
-            conn.execute(text(f"DELETE FROM `{METADATA_TABLE}` WHERE expires_at <= NOW()"))
+        rows = conn.execute(text(f"""
+            SELECT table_name, clustered_table FROM `{METADATA_TABLE}` WHERE expires_at <= NOW()
+        """)).fetchall()
+        if not rows:
+            return []
+        removed = [tname for tname, _ in rows]
+        drop = list(removed)
+        if also_drop_clustered:
+            for tname, clustered in rows:
+                drop.extend({f"{tname}_clustered", clustered or f"{tname}_clustered"})
+        conn.execute(text("DROP TABLE IF EXISTS " + ", ".join(f"`{t}`" for t in drop)))
+        names = ", ".join(f":t{i}" for i in range(len(removed)))
+        conn.execute(text(f"DELETE FROM `{METADATA_TABLE}` WHERE table_name IN ({names})"),
+                     {f"t{i}": t for i, t in enumerate(removed)})
+    # mirror lokal, render peta & model tersimpan ikut dihapus setelah DROP ter-commit
+    for tname in drop:
+        drop_mirror(tname)
+    dropped = tuple(f"{t}@" for t in drop)
+    get_map_cache().invalidate(predicate=lambda k: k.startswith(dropped))
+    delete_models(engine, removed)
     return removed
 
 def days_to_expiry(engine, table_name: str) -> int | None:
     """Mengembalikan sisa hari kedaluwarsa; None jika tidak tercatat."""
-    ensure_meta_table(engine)
+    _ensure_meta_once(engine)
     with engine.connect() as conn:
         row = conn.execute(text(f"""
             SELECT DATEDIFF(expires_at, NOW()) FROM `{METADATA_TABLE}` WHERE table_name=:t
         """), {"t": table_name}).fetchone()
-        return int(row[0]) if row and row[0] is not None else None
\ No newline at end of file
+        return int(row[0]) if row and row[0] is not None else None
+
+class RetentionSweeper:
+    """
+    Thread latar (daemon) yang menjalankan cleanup_expired_datasets tiap interval detik,
+    sehingga render halaman tidak pernah menanggung DDL maupun DROP.
+    """
+
+    def __init__(self, engine, interval: float):
+        self.engine = engine
+        self.interval = float(interval)
+        self.last_run: float | None = None
+        self.last_removed: list[str] = []
+        self.last_error: Exception | None = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="retention-sweeper", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def sweep(self) -> list[str]:
+        try:
+            self.last_removed = cleanup_expired_datasets(self.engine)
+            self.last_error = None
+        except Exception as e:  # DB sementara tidak tersedia: coba lagi pada interval berikutnya
+            self.last_error = e
+        self.last_run = time.time()
+        return self.last_removed
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sweep()
+            self._stop.wait(self.interval)
+
+_sweeper: RetentionSweeper | None = None
+_sweeper_lock = threading.Lock()
+
+def start_retention_sweeper(engine, interval: float = 3600) -> RetentionSweeper:
+    """
+    Siapkan tabel metadata (sekali, saat startup) lalu jalankan sweeper retensi
+    satu kali per proses; pemanggilan berikutnya mengembalikan instance yang sama.
+    """
+    global _sweeper
+    with _sweeper_lock:
+        if _sweeper is None:
+            _ensure_meta_once(engine)
+            _sweeper = RetentionSweeper(engine, interval).start()
+    return _sweeper
\ No newline at end of file
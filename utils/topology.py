@@ -0,0 +1,292 @@
+from __future__ import annotations
+from collections import abc
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+__all__ = [
+    "LOD_LEVELS",
+    "level_for_zoom",
+    "simplify_dp",
+    "Topology",
+    "GeometryView",
+]
+
+# Toleransi Douglas–Peucker (derajat) per tingkat detail, beserta jumlah desimal koordinat
+# keluaran. 0.002° ~ 220 m, masih di bawah 1 piksel pada zoom 8 (~600 m/piksel).
+LOD_LEVELS: Dict[str, Tuple[float, int]] = {
+    "rendah": (0.002, 4),
+    "sedang": (0.0005, 5),
+    "tinggi": (0.0001, 5),
+    "penuh":  (0.0, 6),
+}
+
+def level_for_zoom(zoom: float) -> str:
+    if zoom <= 8:
+        return "rendah"
+    if zoom <= 10:
+        return "sedang"
+    if zoom <= 12:
+        return "tinggi"
+    return "penuh"
+
+def simplify_dp(points: np.ndarray, tolerance: float, min_interior: int = 0) -> np.ndarray:
+    """
+    Indeks titik yang dipertahankan oleh Douglas–Peucker (titik awal & akhir selalu ada).
+    min_interior memaksa sejumlah titik tengah terjauh tetap ada agar ring tidak runtuh.
+    """
+    n = len(points)
+    if n <= 2:
+        return np.arange(n)
+    pts = points.astype(np.float64)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    # arc tertutup (awal == akhir): panjang segmen 0, jarak diukur ke titik awal
+    stack = [(0, n - 1)]
+    n_interior = 0
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        seg = pts[i + 1:j]
+        a, b = pts[i], pts[j]
+        ab = b - a
+        norm = np.hypot(ab[0], ab[1])
+        if norm == 0.0:
+            d = np.hypot(seg[:, 0] - a[0], seg[:, 1] - a[1])
+        else:
+            d = np.abs(ab[0] * (seg[:, 1] - a[1]) - ab[1] * (seg[:, 0] - a[0])) / norm
+        k = int(d.argmax())
+        if d[k] > tolerance or n_interior < min_interior:
+            n_interior += 1
+            m = i + 1 + k
+            keep[m] = True
+            stack.append((i, m))
+            stack.append((m, j))
+    return np.flatnonzero(keep)
+
+def _polygons(geometry: dict | None) -> List[list] | None:
+    if not geometry:
+        return None
+    if geometry.get("type") == "Polygon":
+        return [geometry.get("coordinates") or []]
+    if geometry.get("type") == "MultiPolygon":
+        return geometry.get("coordinates") or []
+    return None
+
+class Topology:
+    """
+    Topologi ala TopoJSON dari FeatureCollection poligon:
+    koordinat dikuantisasi ke grid integer, ring dipotong di titik junction menjadi arc,
+    dan arc yang dipakai bersama dua kecamatan hanya disimpan sekali.
+    Karena tiap arc disederhanakan satu kali, batas bersama tetap identik di kedua sisi
+    (tanpa celah/tumpang tindih) pada semua tingkat detail.
+
+    geometries[i]: None (bukan poligon; geometri asli dipakai) atau list poligon,
+    tiap poligon = list ring, tiap ring = list referensi arc (~a = arc a dibalik).
+    arcs, geometries, dan originals cukup berupa Sequence (mis. view lazy dari GeoStore);
+    arc disederhanakan dan geometri dirakit hanya saat fitur itu diminta.
+    """
+
+    def __init__(self, arcs: Sequence[np.ndarray], geometries: Sequence[Any], originals: Sequence[dict | None],
+                 scale: np.ndarray, translate: np.ndarray, min_interior: np.ndarray | None = None):
+        self.arcs = arcs
+        self.geometries = geometries
+        self.originals = originals
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.translate = np.asarray(translate, dtype=np.float64)
+        self.min_interior = self._arc_min_interior() if min_interior is None else min_interior
+        self._kept: Dict[str, List[np.ndarray | None]] = {}
+        self._levels: Dict[str, Dict[int, dict | None]] = {}
+
+    # ---------- pembangunan ----------
+    @classmethod
+    def from_geojson(cls, feature_collection: dict, quantization: int = 1_000_000) -> "Topology":
+        feats = list(feature_collection.get("features", []))
+        originals = [f.get("geometry") for f in feats]
+        raw: List[List[List[np.ndarray]] | None] = []
+        all_pts = []
+        for geom in originals:
+            polys = _polygons(geom)
+            if polys is None:
+                raw.append(None)
+                continue
+            rings_of = []
+            for poly in polys:
+                rings = [np.asarray([c[:2] for c in ring], dtype=np.float64) for ring in poly if len(ring) >= 4]
+                rings_of.append(rings)
+                all_pts.extend(rings)
+            raw.append(rings_of)
+
+        if all_pts:
+            stacked = np.concatenate(all_pts)
+            lo, hi = stacked.min(axis=0), stacked.max(axis=0)
+        else:
+            lo, hi = np.zeros(2), np.ones(2)
+        span = np.where(hi > lo, hi - lo, 1.0)
+        scale = span / (quantization - 1)
+        translate = lo
+
+        # kuantisasi + buang titik berurutan yang sama
+        qrings: List[np.ndarray] = []
+        layout: List[Any] = []
+        for rings_of in raw:
+            if rings_of is None:
+                layout.append(None)
+                continue
+            polys_idx = []
+            for rings in rings_of:
+                idx = []
+                for r in rings:
+                    q = np.round((r - translate) / scale).astype(np.int64)
+                    q = q[np.r_[True, (np.diff(q, axis=0) != 0).any(axis=1)]]
+                    if len(q) < 4:
+                        continue
+                    if (q[0] != q[-1]).any():
+                        q = np.vstack([q, q[:1]])
+                    idx.append(len(qrings))
+                    qrings.append(q)
+                if idx:
+                    polys_idx.append(idx)
+            layout.append(polys_idx)
+
+        junctions = cls._junctions(qrings)
+        arcs: List[np.ndarray] = []
+        arc_ids: Dict[bytes, int] = {}
+        ring_arcs = [cls._cut_ring(q, junctions, arcs, arc_ids) for q in qrings]
+        geometries = [None if polys is None else [[ring_arcs[r] for r in poly] for poly in polys]
+                      for polys in layout]
+        return cls(arcs, geometries, originals, scale, translate)
+
+    @staticmethod
+    def _keys(q: np.ndarray) -> np.ndarray:
+        return (q[:, 0] << 32) | (q[:, 1] & 0xFFFFFFFF)
+
+    @classmethod
+    def _junctions(cls, qrings: List[np.ndarray]) -> set:
+        """Titik yang tetangganya berbeda di ring lain (awal/akhir batas bersama)."""
+        if not qrings:
+            return set()
+        keys, pairs = [], []
+        for q in qrings:
+            k = cls._keys(q[:-1])  # ring tertutup: titik terakhir = titik pertama
+            prev, nxt = np.roll(k, 1), np.roll(k, -1)
+            keys.append(k)
+            pairs.append(np.stack([np.minimum(prev, nxt), np.maximum(prev, nxt)], axis=1))
+        keys = np.concatenate(keys)
+        pairs = np.concatenate(pairs)
+        uniq = np.unique(np.column_stack([keys, pairs]), axis=0)
+        pts, counts = np.unique(uniq[:, 0], return_counts=True)
+        return set(pts[counts > 1].tolist())
+
+    @classmethod
+    def _cut_ring(cls, q: np.ndarray, junctions: set, arcs: List[np.ndarray], arc_ids: Dict[bytes, int]) -> List[int]:
+        keys = cls._keys(q[:-1])
+        cut = [i for i, k in enumerate(keys.tolist()) if k in junctions]
+        body = q[:-1]
+        if not cut:
+            # ring tanpa junction: putar ke titik terkecil agar ring identik tersimpan sekali
+            start = int(np.lexsort((body[:, 1], body[:, 0]))[0])
+            body = np.roll(body, -start, axis=0)
+            pieces = [np.vstack([body, body[:1]])]
+        else:
+            body = np.roll(body, -cut[0], axis=0)
+            offs = [c - cut[0] for c in cut] + [len(body)]
+            closed = np.vstack([body, body[:1]])
+            pieces = [closed[a:b + 1] for a, b in zip(offs[:-1], offs[1:])]
+        refs = []
+        for arc in pieces:
+            fwd = np.ascontiguousarray(arc).tobytes()
+            rev = np.ascontiguousarray(arc[::-1]).tobytes()
+            if fwd in arc_ids:
+                refs.append(arc_ids[fwd])
+            elif rev in arc_ids:
+                refs.append(~arc_ids[rev])
+            else:
+                arc_ids[fwd] = len(arcs)
+                refs.append(len(arcs))
+                arcs.append(arc)
+        return refs
+
+    def _arc_min_interior(self) -> np.ndarray:
+        # ring dengan sedikit arc butuh titik tengah agar tetap poligon valid (>= 3 titik berbeda)
+        need = np.zeros(len(self.arcs), dtype=np.int64)
+        for polys in self.geometries:
+            for poly in polys or []:
+                for ring in poly:
+                    if len(ring) <= 2:
+                        for a in ring:
+                            i = a if a >= 0 else ~a
+                            need[i] = max(need[i], 3 - len(ring))
+        return need
+
+    # ---------- penyederhanaan & keluaran ----------
+    def _kept_arc(self, level: str, a: int) -> np.ndarray:
+        """Arc a setelah penyederhanaan level (dihitung sekali per arc per level)."""
+        kept = self._kept.get(level)
+        if kept is None:
+            kept = self._kept[level] = [None] * len(self.arcs)
+        arc = kept[a]
+        if arc is None:
+            arc = self.arcs[a]
+            tol = LOD_LEVELS[level][0]
+            if tol > 0:
+                arc = arc[simplify_dp(arc, tol / float(self.scale.max()), int(self.min_interior[a]))]
+            kept[a] = arc
+        return arc
+
+    def _ring_coords(self, ring: List[int], level: str) -> np.ndarray:
+        parts = []
+        for n, a in enumerate(ring):
+            arc = self._kept_arc(level, a) if a >= 0 else self._kept_arc(level, ~a)[::-1]
+            parts.append(arc if n == 0 else arc[1:])  # titik sambungan tidak diulang
+        q = np.concatenate(parts)
+        return q * self.scale + self.translate
+
+    def geometry(self, i: int, level: str) -> dict | None:
+        """Geometri GeoJSON (koordinat float) fitur i pada tingkat detail level."""
+        cache = self._levels.setdefault(level, {})
+        if i in cache:
+            return cache[i]
+        geom = self.geometries[i]
+        if geom is None:
+            out = self.originals[i]
+        else:
+            decimals = LOD_LEVELS[level][1]
+            polys = [[np.round(self._ring_coords(r, level), decimals).tolist() for r in poly] for poly in geom]
+            if len(polys) == 1:
+                out = {"type": "Polygon", "coordinates": polys[0]}
+            else:
+                out = {"type": "MultiPolygon", "coordinates": polys}
+        cache[i] = out
+        return out
+
+    def geometries_at(self, level: str) -> "GeometryView":
+        """View geometri semua fitur pada tingkat detail level; dirakit saat diindeks."""
+        return GeometryView(self, level)
+
+    def arcs_of(self, ids: Iterable[int]) -> np.ndarray:
+        """Id arc unik yang dipakai fitur ids."""
+        used = {a if a >= 0 else ~a
+                for i in ids for poly in (self.geometries[i] or []) for ring in poly for a in ring}
+        return np.fromiter(sorted(used), dtype=np.int64, count=len(used))
+
+    def n_points(self, level: str, ids: Iterable[int] | None = None) -> int:
+        """Jumlah titik arc pada level (untuk fitur ids saja bila diisi)."""
+        arcs = range(len(self.arcs)) if ids is None else self.arcs_of(ids).tolist()
+        return int(sum(len(self._kept_arc(level, a)) for a in arcs))
+
+class GeometryView(abc.Sequence):
+    """Sequence geometri satu tingkat detail; fitur dirakit (dan di-cache) saat diakses."""
+
+    def __init__(self, topology: Topology, level: str):
+        self.topology = topology
+        self.level = level
+
+    def __len__(self) -> int:
+        return len(self.topology.geometries)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self.topology.geometry(int(i), self.level)